@@ -0,0 +1,179 @@
+import logging
+import math
+import os
+from functools import lru_cache
+from database import QUERIES, PARAMETERIZED_QUERIES, execute_query
+
+# DuckDB is optional: without it the query page simply stays on SQLite
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+SNAPSHOT_TABLES = ("Channel", "Playlist", "Video", "Comment", "Tag", "VideoTag")
+
+# Queries whose SQLite syntax DuckDB does not accept
+DUCKDB_QUERY_OVERRIDES = {
+    "videos_for_tags": """
+        SELECT Video.video_name, Video.view_count, Channel.channel_name
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        WHERE Video.video_id IN (
+            SELECT VideoTag.video_id
+            FROM VideoTag
+            JOIN Tag ON VideoTag.tag_id = Tag.tag_id
+            WHERE Tag.tag_name IN (SELECT unnest(CAST(CAST(? AS JSON) AS VARCHAR[])))
+            GROUP BY VideoTag.video_id
+            HAVING COUNT(*) = len(list_distinct(CAST(CAST(? AS JSON) AS VARCHAR[])))
+        )
+        ORDER BY Video.view_count DESC, Video.video_id
+        LIMIT 50;
+    """
+}
+
+
+def duckdb_available():
+    return duckdb is not None
+
+
+@lru_cache(maxsize=None)
+def sqlite_extension_available():
+    """
+    Whether DuckDB can load its sqlite extension, which is downloaded on first
+    use. Offline hosts without a cached copy cannot attach the SQLite file.
+    """
+    if duckdb is None:
+        return False
+    con = duckdb.connect()
+    try:
+        con.execute("INSTALL sqlite")
+        con.execute("LOAD sqlite")
+        return True
+    except duckdb.Error as e:
+        logging.warning(f"DuckDB sqlite extension unavailable: {e}")
+        return False
+    finally:
+        con.close()
+
+
+def get_db_path(conn):
+    """Returns the file backing a SQLite connection's main database."""
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1] == "main":
+            return row[2]
+    return ""
+
+
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def connect_analytics(db_path="youtube_data.db", parquet_dir=None):
+    """
+    Opens an in-memory DuckDB connection over the app data.
+
+    By default the SQLite file is attached read-only, so queries always see the
+    latest rows. With `parquet_dir`, tables are read from the Parquet snapshot
+    written by export_parquet_snapshot instead, which is faster for large tables
+    but only as fresh as the last export.
+    """
+    if duckdb is None:
+        raise ImportError("The DuckDB analytics backend requires the 'duckdb' package.")
+
+    con = duckdb.connect()
+    if parquet_dir:
+        for table in SNAPSHOT_TABLES:
+            path = os.path.join(parquet_dir, f"{table}.parquet")
+            con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet({_quote(path)})")
+        logging.info(f"DuckDB analytics connected to Parquet snapshot in {parquet_dir}.")
+    else:
+        if not sqlite_extension_available():
+            con.close()
+            raise ImportError(
+                "Attaching SQLite from DuckDB requires its 'sqlite' extension, which could not be installed."
+            )
+        con.execute("LOAD sqlite")
+        con.execute(f"ATTACH {_quote(db_path)} AS youtube (TYPE sqlite, READ_ONLY)")
+        con.execute("USE youtube")
+        logging.info(f"DuckDB analytics attached SQLite database {db_path}.")
+    return con
+
+
+def export_parquet_snapshot(db_path="youtube_data.db", parquet_dir="parquet"):
+    """Exports the core tables to ZSTD-compressed Parquet files for connect_analytics."""
+    if duckdb is None:
+        raise ImportError("Parquet export requires the 'duckdb' package.")
+
+    os.makedirs(parquet_dir, exist_ok=True)
+    con = connect_analytics(db_path)
+    try:
+        for table in SNAPSHOT_TABLES:
+            path = os.path.join(parquet_dir, f"{table}.parquet")
+            tmp_path = path + ".tmp"
+            con.execute(
+                f"COPY (SELECT * FROM {table}) TO {_quote(tmp_path)} (FORMAT parquet, COMPRESSION zstd)"
+            )
+            # Swap in atomically so readers never see a half-written file
+            os.replace(tmp_path, path)
+        logging.info(f"Exported Parquet snapshot to {parquet_dir}.")
+    finally:
+        con.close()
+
+
+def get_query_results_duckdb(con, query_type, params=()):
+    query = DUCKDB_QUERY_OVERRIDES.get(query_type) or QUERIES.get(query_type, "")
+    if not query:
+        raise ValueError(f"Invalid query type: {query_type}")
+
+    cursor = con.execute(query, list(params))
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _normalize(rows, ordered):
+    def norm_value(value):
+        if isinstance(value, float):
+            return None if math.isnan(value) else round(value, 6)
+        return value
+
+    normalized = [tuple(sorted((k, norm_value(v)) for k, v in row.items())) for row in rows]
+    return normalized if ordered else sorted(normalized, key=repr)
+
+
+def _describe_mismatch(expected, actual):
+    """Names the first position where the engines disagree and both rows found there."""
+    for index in range(max(len(expected), len(actual))):
+        sqlite_row = dict(expected[index]) if index < len(expected) else None
+        duckdb_row = dict(actual[index]) if index < len(actual) else None
+        if sqlite_row != duckdb_row:
+            return (
+                f"row {index} differs (SQLite {len(expected)} rows, DuckDB {len(actual)} rows): "
+                f"SQLite {sqlite_row}, DuckDB {duckdb_row}"
+            )
+    return "results differ"
+
+
+def check_backend_parity(conn, con, sample_params=None):
+    """
+    Runs every predefined query on SQLite and DuckDB and compares the results.
+    Parameterized queries use their PARAMETERIZED_QUERIES sample parameters,
+    or `sample_params[query_type]` when given. Row order is only compared for
+    queries with an ORDER BY. Returns a dict of {query_type: error message}
+    for mismatching queries; empty means parity.
+    """
+    sample_params = dict(PARAMETERIZED_QUERIES, **(sample_params or {}))
+    mismatches = {}
+    for query_type, query in QUERIES.items():
+        params = sample_params.get(query_type, ())
+        ordered = "ORDER BY" in query.upper()
+        try:
+            expected = _normalize(execute_query(conn, query, params), ordered)
+            actual = _normalize(get_query_results_duckdb(con, query_type, params), ordered)
+        except Exception as e:
+            mismatches[query_type] = f"query failed: {e}"
+            continue
+        if expected != actual:
+            mismatches[query_type] = _describe_mismatch(expected, actual)
+    logging.info(f"Backend parity check: {len(QUERIES) - len(mismatches)}/{len(QUERIES)} queries match.")
+    return mismatches
@@ -3,6 +3,30 @@ from datetime import datetime
 import warnings
 
 
+def parse_api_timestamp(value):
+    """Parses an API timestamp such as '2024-01-31T12:00:00Z' (fractional seconds allowed)."""
+    return datetime.strptime(value.replace("Z", "").split(".")[0], "%Y-%m-%dT%H:%M:%S")
+
+
+def transform_comment(comment_id, video_id, snippet, parent_id=None):
+    """
+    Transforms a single commentThreads/comments API snippet into a Comment record.
+    Top-level comments have no parent_id; replies point at their thread id.
+    """
+    published = snippet.get("publishedAt")
+    updated = snippet.get("updatedAt")
+    return {
+        "comment_id": comment_id,
+        "video_id": video_id,
+        "comment_text": snippet.get("textDisplay", ""),
+        "comment_author": snippet.get("authorDisplayName", "Unknown"),
+        "comment_published_date": parse_api_timestamp(published) if published else datetime.utcnow(),
+        "parent_id": parent_id,
+        "like_count": int(snippet.get("likeCount", 0)),
+        "updated_at": parse_api_timestamp(updated) if updated else None
+    }
+
+
 def transform_channel_data(raw_data):
     """
     Transforms raw YouTube API data into structured records:
@@ -86,7 +110,8 @@ def transform_channel_data(raw_data):
                 "comment_count": value.get("Comment_Count", 0),
                 "duration": duration_sec,
                 "thumbnail": value.get("Thumbnail", ""),
-                "caption": value.get("Caption_Status", "")
+                "caption": value.get("Caption_Status", ""),
+                "tags": value.get("Tags", [])
             }
             videos.append(video)
 
@@ -97,10 +122,11 @@ def transform_channel_data(raw_data):
                         "video_id": video_id,
                         "comment_text": cdata.get("Comment_Text", ""),
                         "comment_author": cdata.get("Comment_Author", ""),
-                        "comment_published_date": datetime.strptime(
-                            cdata["Comment_PublishedAt"].replace("Z", ""),
-                            "%Y-%m-%dT%H:%M:%S"
-                        )
+                        "comment_published_date": parse_api_timestamp(cdata["Comment_PublishedAt"]),
+                        "parent_id": cdata.get("Parent_Id"),
+                        "like_count": cdata.get("Like_Count", 0),
+                        "updated_at": parse_api_timestamp(cdata["Comment_UpdatedAt"])
+                        if cdata.get("Comment_UpdatedAt") else None
                     }
                     comments.append(comment)
                 except Exception as ce:
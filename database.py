@@ -1,6 +1,12 @@
 import sqlite3 as sql
+import calendar
+import hashlib
+import json
 import logging
 import os
+import time
+from collections import deque
+from datetime import datetime
 
 print("LOADED DATABASE.PY VERSION: SQLITE + PARAMS")
 # Setup logs
@@ -12,9 +18,23 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
+# Statements slower than this are logged with their query plan
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_LOG_SIZE = 100
+
+
+class TimedConnection(sql.Connection):
+    """A SQLite connection that keeps its own recent slow queries, so sessions never see each other's."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
 def connect_to_db(db_path="youtube_data.db"):
     try:
-        conn = sql.connect(db_path, detect_types=sql.PARSE_DECLTYPES | sql.PARSE_COLNAMES, check_same_thread=False)
+        conn = sql.connect(db_path, detect_types=sql.PARSE_DECLTYPES | sql.PARSE_COLNAMES, check_same_thread=False,
+                           factory=TimedConnection)
         conn.row_factory = sql.Row  # For dict-like access
         logging.info("SQLite connection successful.")
         return conn
@@ -28,6 +48,8 @@ def create_database(conn, db_name):
 def create_tables(conn):
     cursor = conn.cursor()
     try:
+        # Only takes effect on a new, empty file; see maintenance.enable_incremental_vacuum
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL;")
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS Channel (
                 channel_id TEXT PRIMARY KEY,
@@ -53,6 +75,7 @@ def create_tables(conn):
                 video_name TEXT,
                 video_description TEXT,
                 published_date TEXT,
+                published_ts INTEGER,
                 view_count INTEGER,
                 like_count INTEGER,
                 dislike_count INTEGER,
@@ -71,21 +94,150 @@ def create_tables(conn):
                 comment_text TEXT,
                 comment_author TEXT,
                 comment_published_date TEXT,
+                comment_published_ts INTEGER,
+                parent_id TEXT,
+                like_count INTEGER,
+                updated_at TEXT,
+                FOREIGN KEY (video_id) REFERENCES Video (video_id)
+            );
+        """)
+        # Databases created before reply harvesting lack these columns
+        add_missing_columns(cursor, "Comment", {
+            "parent_id": "TEXT",
+            "like_count": "INTEGER",
+            "updated_at": "TEXT"
+        })
+        # Integer epoch publish times, backfilled from the older TEXT columns
+        add_missing_columns(cursor, "Video", {"published_ts": "INTEGER"})
+        add_missing_columns(cursor, "Comment", {"comment_published_ts": "INTEGER"})
+        cursor.execute("""
+            UPDATE Video SET published_ts = CAST(strftime('%s', published_date) AS INTEGER)
+            WHERE published_ts IS NULL AND published_date IS NOT NULL;
+        """)
+        cursor.execute("""
+            UPDATE Comment SET comment_published_ts = CAST(strftime('%s', comment_published_date) AS INTEGER)
+            WHERE comment_published_ts IS NULL AND comment_published_date IS NOT NULL;
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_playlist_channel ON Playlist (channel_id);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_published_ts ON Video (published_ts);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_playlist_ts ON Video (playlist_id, published_ts);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_comment_published_ts ON Comment (comment_published_ts);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_comment_video_ts ON Comment (video_id, comment_published_ts);")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS CommentHarvestState (
+                video_id TEXT PRIMARY KEY,
+                page_token TEXT,
+                completed INTEGER DEFAULT 0,
                 FOREIGN KEY (video_id) REFERENCES Video (video_id)
             );
         """)
+        # Append-only statistics history (see stats_history.py). Counters are
+        # delta-encoded against the previous snapshot; resolution is the bucket
+        # width in seconds (0 = raw snapshot, 3600 = hourly, 86400 = daily).
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS StatsSnapshot (
+                entity_type TEXT,
+                entity_id TEXT,
+                ts INTEGER,
+                resolution INTEGER,
+                view_delta INTEGER,
+                like_delta INTEGER,
+                comment_delta INTEGER,
+                PRIMARY KEY (entity_type, entity_id, ts, resolution)
+            ) WITHOUT ROWID;
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_stats_snapshot_resolution_ts
+            ON StatsSnapshot (resolution, ts);
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS StatsLatest (
+                entity_type TEXT,
+                entity_id TEXT,
+                ts INTEGER,
+                view_count INTEGER,
+                like_count INTEGER,
+                comment_count INTEGER,
+                PRIMARY KEY (entity_type, entity_id)
+            ) WITHOUT ROWID;
+        """)
+        # Tag inverted index: each tag name is stored once and referenced by id
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS Tag (
+                tag_id INTEGER PRIMARY KEY,
+                tag_name TEXT UNIQUE
+            );
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS VideoTag (
+                video_id TEXT,
+                tag_id INTEGER,
+                PRIMARY KEY (video_id, tag_id),
+                FOREIGN KEY (video_id) REFERENCES Video (video_id),
+                FOREIGN KEY (tag_id) REFERENCES Tag (tag_id)
+            ) WITHOUT ROWID;
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_videotag_tag ON VideoTag (tag_id, video_id);")
         conn.commit()
         logging.info("Tables created successfully.")
     finally:
         cursor.close()
 
-def insert_channel(conn, channel):
-    cursor = conn.cursor()
-    query = """
-        INSERT OR REPLACE INTO Channel (
-            channel_id, channel_name, channel_type, channel_views, channel_description, channel_status
-        ) VALUES (?, ?, ?, ?, ?, ?)
+def add_missing_columns(cursor, table, columns):
+    """Adds any of the given {name: type} columns that the table does not have yet."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, col_type in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+            logging.info(f"Added column {table}.{name}.")
+
+def to_epoch(value):
+    """Converts a datetime (naive values are UTC), ISO string or number to integer epoch seconds."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return int(value)
+
+def normalize_tag(tag):
+    return " ".join(str(tag).lower().split())
+
+def tag_id_for(tag_name):
     """
+    Interned id for a normalized tag name. Derived from a hash rather than
+    autoincrement so every shard assigns the same id to the same tag.
+    """
+    digest = hashlib.blake2b(tag_name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def _upsert_query(table, key, columns, keep_columns=()):
+    """
+    Builds an INSERT that updates existing rows in place. Columns listed in
+    `keep_columns` are only written for new rows, so fetches that leave them
+    out (e.g. the "lean" field profile) do not blank stored values.
+    """
+    updates = [f"{column} = excluded.{column}" for column in columns
+               if column != key and column not in keep_columns]
+    return f"""
+        INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})
+        ON CONFLICT ({key}) DO UPDATE SET {", ".join(updates)}
+    """
+
+CHANNEL_COLUMNS = (
+    "channel_id", "channel_name", "channel_type", "channel_views", "channel_description", "channel_status"
+)
+VIDEO_COLUMNS = (
+    "video_id", "playlist_id", "video_name", "video_description", "published_date", "published_ts",
+    "view_count", "like_count", "dislike_count", "favorite_count", "comment_count",
+    "duration", "thumbnail", "caption"
+)
+
+def insert_channel(conn, channel, keep_columns=()):
+    cursor = conn.cursor()
+    query = _upsert_query("Channel", "channel_id", CHANNEL_COLUMNS, keep_columns)
     values = (
         channel["channel_id"],
         channel["channel_name"],
@@ -113,15 +265,9 @@ def insert_playlist(conn, playlist):
     conn.commit()
     cursor.close()
 
-def insert_videos(conn, videos):
+def insert_videos(conn, videos, keep_columns=()):
     cursor = conn.cursor()
-    query = """
-        INSERT OR REPLACE INTO Video (
-            video_id, playlist_id, video_name, video_description, published_date,
-            view_count, like_count, dislike_count, favorite_count, comment_count,
-            duration, thumbnail, caption
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
+    query = _upsert_query("Video", "video_id", VIDEO_COLUMNS, keep_columns)
     for video in videos:
         values = (
             video["video_id"],
@@ -129,6 +275,7 @@ def insert_videos(conn, videos):
             video["video_name"],
             video["video_description"],
             str(video["published_date"]),
+            to_epoch(video["published_date"]),
             video["view_count"],
             video["like_count"],
             video["dislike_count"],
@@ -139,105 +286,385 @@ def insert_videos(conn, videos):
             video["caption"]
         )
         cursor.execute(query, values)
+    insert_video_tags(cursor, videos)
     conn.commit()
     cursor.close()
 
-def insert_comments(conn, comments):
+def insert_video_tags(cursor, videos):
+    """Replaces the tag links of every video that carries a "tags" list."""
+    tagged = [video for video in videos if "tags" in video]
+    if not tagged:
+        return
+
+    tags = {}
+    links = []
+    for video in tagged:
+        for tag in video["tags"] or []:
+            tag_name = normalize_tag(tag)
+            if not tag_name:
+                continue
+            tag_id = tags.setdefault(tag_name, tag_id_for(tag_name))
+            links.append((video["video_id"], tag_id))
+
+    cursor.executemany("DELETE FROM VideoTag WHERE video_id = ?", [(video["video_id"],) for video in tagged])
+    cursor.executemany(
+        "INSERT OR IGNORE INTO Tag (tag_id, tag_name) VALUES (?, ?)",
+        [(tag_id, tag_name) for tag_name, tag_id in tags.items()]
+    )
+    cursor.executemany("INSERT OR IGNORE INTO VideoTag (video_id, tag_id) VALUES (?, ?)", links)
+
+def insert_comments(conn, comments, commit=True):
     cursor = conn.cursor()
     query = """
         INSERT OR REPLACE INTO Comment (
-            comment_id, video_id, comment_text, comment_author, comment_published_date
-        ) VALUES (?, ?, ?, ?, ?)
+            comment_id, video_id, comment_text, comment_author, comment_published_date,
+            comment_published_ts, parent_id, like_count, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
     """
-    for comment in comments:
-        values = (
+    values = [
+        (
             comment["comment_id"],
             comment["video_id"],
             comment["comment_text"],
             comment["comment_author"],
-            str(comment["comment_published_date"])
+            str(comment["comment_published_date"]),
+            to_epoch(comment["comment_published_date"]),
+            comment.get("parent_id"),
+            comment.get("like_count", 0),
+            str(comment["updated_at"]) if comment.get("updated_at") else None
         )
-        cursor.execute(query, values)
+        for comment in comments
+    ]
+    cursor.executemany(query, values)
+    if commit:
+        conn.commit()
+    cursor.close()
+
+def get_comment_harvest_state(conn, video_id):
+    """Returns (page_token, completed) for a video, or (None, False) if never harvested."""
+    row = conn.execute(
+        "SELECT page_token, completed FROM CommentHarvestState WHERE video_id = ?",
+        (video_id,)
+    ).fetchone()
+    if not row:
+        return None, False
+    return row["page_token"], bool(row["completed"])
+
+def save_comment_harvest_state(conn, video_id, page_token, completed=False, commit=True):
+    conn.execute("""
+        INSERT OR REPLACE INTO CommentHarvestState (video_id, page_token, completed)
+        VALUES (?, ?, ?)
+    """, (video_id, page_token, int(completed)))
+    if commit:
+        conn.commit()
+
+def explain_query(conn, query, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines for a statement."""
+    rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    return [row[3] for row in rows]
+
+def _record_timing(conn, query, params, elapsed_ms, row_count):
+    logging.debug(f"Query took {elapsed_ms:.1f} ms ({row_count} rows): {' '.join(query.split())[:200]}")
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    try:
+        plan = explain_query(conn, query, params)
+    except Exception as e:
+        plan = [f"plan unavailable: {e}"]
+    # "SCAN" steps read a whole table or index; "SEARCH" steps use an index lookup
+    full_scans = [step for step in plan if step.startswith("SCAN")]
+    entry = {
+        "query": " ".join(query.split()),
+        "elapsed_ms": round(elapsed_ms, 1),
+        "rows": row_count,
+        "plan": plan,
+        "full_scans": full_scans
+    }
+    # Connections not opened through connect_to_db only get the log line
+    slow_queries = getattr(conn, "slow_queries", None)
+    if slow_queries is not None:
+        slow_queries.append(entry)
+    logging.warning(
+        f"Slow query ({entry['elapsed_ms']} ms, {row_count} rows"
+        f"{', FULL SCAN: ' + '; '.join(full_scans) if full_scans else ''}): {entry['query']}\n"
+        + "\n".join(f"    {step}" for step in plan)
+    )
+
+def get_slow_queries(conn):
+    """Returns the most recent slow queries run on `conn`, newest first."""
+    return list(reversed(getattr(conn, "slow_queries", ())))
+
+def update_statistics(conn, channel, videos):
+    """Updates only the counters of an existing channel and its videos (see fetch.refresh_statistics)."""
+    cursor = conn.cursor()
+    if channel:
+        cursor.execute(
+            "UPDATE Channel SET channel_views = ? WHERE channel_id = ?",
+            (channel["channel_views"], channel["channel_id"])
+        )
+    cursor.executemany(
+        "UPDATE Video SET view_count = ?, like_count = ?, comment_count = ? WHERE video_id = ?",
+        [(v["view_count"], v["like_count"], v["comment_count"], v["video_id"]) for v in videos]
+    )
     conn.commit()
     cursor.close()
 
+def store_channel_data(conn, cleaned_data, keep_columns=None):
+    """
+    Writes transformed channel data (see transform_channel_data) in one go.
+    `keep_columns` maps "Channel"/"Video" to columns the fetch did not request,
+    which keep their stored values for existing rows.
+    """
+    keep_columns = keep_columns or {}
+    insert_channel(conn, cleaned_data["channel"], keep_columns.get("Channel", ()))
+    for playlist in cleaned_data["playlists"]:
+        insert_playlist(conn, playlist)
+    insert_videos(conn, cleaned_data["videos"], keep_columns.get("Video", ()))
+    insert_comments(conn, cleaned_data["comments"])
+    conn.commit()
+
 def execute_query(conn, query, params=()):
     cursor = conn.cursor()
     try:
+        start = time.perf_counter()
         cursor.execute(query, params)
         rows = cursor.fetchall()
+        _record_timing(conn, query, params, (time.perf_counter() - start) * 1000, len(rows))
         return [dict(row) for row in rows]
     finally:
         cursor.close()
 
-def get_query_results(conn, query_type):
-    queries = {
-        "video_channel_names": """
-            SELECT Video.video_name AS video_name, Channel.channel_name AS channel_name
-            FROM Video
-            JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
-            JOIN Channel ON Playlist.channel_id = Channel.channel_id;
-        """,
-        "most_videos_channels": """
-            SELECT Channel.channel_name AS channel_name, COUNT(Video.video_id) AS video_count
-            FROM Video
-            JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
-            JOIN Channel ON Playlist.channel_id = Channel.channel_id
-            GROUP BY Channel.channel_name
-            ORDER BY video_count DESC
-            LIMIT 1;
-        """,
-        "top_viewed_videos": """
-            SELECT Video.video_name, Video.view_count, Channel.channel_name
-            FROM Video
-            JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
-            JOIN Channel ON Playlist.channel_id = Channel.channel_id
-            ORDER BY Video.view_count DESC
-            LIMIT 10;
-        """,
-        "video_comment_counts": """
-            SELECT video_name, comment_count FROM Video;
-        """,
-        "most_liked_videos": """
-            SELECT Video.video_name, Video.like_count, Channel.channel_name
-            FROM Video
-            JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
-            JOIN Channel ON Playlist.channel_id = Channel.channel_id
-            ORDER BY like_count DESC
-            LIMIT 10;
-        """,
-        "video_likes_dislikes": """
-            SELECT video_name, like_count, dislike_count FROM Video;
-        """,
-        "channel_total_views": """
-            SELECT channel_name, channel_views AS total_views FROM Channel;
-        """,
-        "channels_published_2026": """
-            SELECT DISTINCT Channel.channel_name
-            FROM Video
-            JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
-            JOIN Channel ON Playlist.channel_id = Channel.channel_id
-            WHERE strftime('%Y', published_date) = '2026';
-        """,
-        "average_video_duration": """
-            SELECT Channel.channel_name, ROUND(AVG(Video.duration)/60, 2) AS avg_duration_minutes
-            FROM Video
-            JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
-            JOIN Channel ON Playlist.channel_id = Channel.channel_id
-            GROUP BY Channel.channel_name;
-        """,
-        "most_commented_videos": """
-            SELECT Video.video_name, Video.comment_count, Channel.channel_name
-            FROM Video
+def iter_query(conn, query, params=(), batch_size=1000):
+    """
+    Streams query results as lists of at most `batch_size` dicts instead of
+    materializing every row. Only time spent inside SQLite counts towards the
+    slow-query threshold, not time the caller spends between batches.
+    """
+    cursor = conn.cursor()
+    try:
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        elapsed = time.perf_counter() - start
+        row_count = 0
+        while True:
+            start = time.perf_counter()
+            rows = cursor.fetchmany(batch_size)
+            elapsed += time.perf_counter() - start
+            if not rows:
+                break
+            row_count += len(rows)
+            yield [dict(row) for row in rows]
+        _record_timing(conn, query, params, elapsed * 1000, row_count)
+    finally:
+        cursor.close()
+
+# Predefined analytics queries, shared by every query engine (see analytics.py)
+QUERIES = {
+    "video_channel_names": """
+        SELECT Video.video_name AS video_name, Channel.channel_name AS channel_name
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id;
+    """,
+    "most_videos_channels": """
+        SELECT Channel.channel_name AS channel_name, COUNT(Video.video_id) AS video_count
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        GROUP BY Channel.channel_name
+        ORDER BY video_count DESC, channel_name
+        LIMIT 1;
+    """,
+    "top_viewed_videos": """
+        SELECT Video.video_name, Video.view_count, Channel.channel_name
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        ORDER BY Video.view_count DESC, Video.video_id
+        LIMIT 10;
+    """,
+    "video_comment_counts": """
+        SELECT video_name, comment_count FROM Video;
+    """,
+    "most_liked_videos": """
+        SELECT Video.video_name, Video.like_count, Channel.channel_name
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        ORDER BY like_count DESC, Video.video_id
+        LIMIT 10;
+    """,
+    "video_likes_dislikes": """
+        SELECT video_name, like_count, dislike_count FROM Video;
+    """,
+    "channel_total_views": """
+        SELECT channel_name, channel_views AS total_views FROM Channel;
+    """,
+    "channels_published_2026": """
+        SELECT DISTINCT Channel.channel_name
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        WHERE Video.published_ts >= 1767225600  -- 2026-01-01 00:00:00 UTC
+          AND Video.published_ts < 1798761600;  -- 2027-01-01 00:00:00 UTC
+    """,
+    "average_video_duration": """
+        SELECT Channel.channel_name, ROUND(AVG(Video.duration)/60, 2) AS avg_duration_minutes
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        GROUP BY Channel.channel_name;
+    """,
+    "most_commented_videos": """
+        SELECT Video.video_name, Video.comment_count, Channel.channel_name
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        ORDER BY comment_count DESC, Video.video_id
+        LIMIT 10;
+    """,
+    "top_tags_per_channel": """
+        SELECT channel_name, tag_name, video_count FROM (
+            SELECT Channel.channel_name, Tag.tag_name, COUNT(*) AS video_count,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY Channel.channel_id ORDER BY COUNT(*) DESC, Tag.tag_name
+                   ) AS tag_rank
+            FROM VideoTag
+            JOIN Tag ON VideoTag.tag_id = Tag.tag_id
+            JOIN Video ON VideoTag.video_id = Video.video_id
             JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
             JOIN Channel ON Playlist.channel_id = Channel.channel_id
-            ORDER BY comment_count DESC
-            LIMIT 10;
-        """
-    }
+            GROUP BY Channel.channel_id, Channel.channel_name, Tag.tag_id, Tag.tag_name
+        )
+        WHERE tag_rank <= 10
+        ORDER BY channel_name, video_count DESC, tag_name;
+    """,
+    "tag_cooccurrence": """
+        SELECT first_tag.tag_name AS tag, second_tag.tag_name AS co_tag, COUNT(*) AS video_count
+        FROM VideoTag AS first
+        JOIN VideoTag AS second ON first.video_id = second.video_id AND first.tag_id < second.tag_id
+        JOIN Tag AS first_tag ON first.tag_id = first_tag.tag_id
+        JOIN Tag AS second_tag ON second.tag_id = second_tag.tag_id
+        GROUP BY first_tag.tag_name, second_tag.tag_name
+        ORDER BY video_count DESC, tag, co_tag
+        LIMIT 20;
+    """,
+    # Takes the tags as a JSON array, twice (see tag_query_params)
+    "videos_for_tags": """
+        SELECT Video.video_name, Video.view_count, Channel.channel_name
+        FROM Video
+        JOIN Playlist ON Video.playlist_id = Playlist.playlist_id
+        JOIN Channel ON Playlist.channel_id = Channel.channel_id
+        WHERE Video.video_id IN (
+            SELECT VideoTag.video_id
+            FROM VideoTag
+            JOIN Tag ON VideoTag.tag_id = Tag.tag_id
+            WHERE Tag.tag_name IN (SELECT value FROM json_each(?))
+            GROUP BY VideoTag.video_id
+            HAVING COUNT(*) = (SELECT COUNT(DISTINCT value) FROM json_each(?))
+        )
+        ORDER BY Video.view_count DESC, Video.video_id
+        LIMIT 50;
+    """
+}
 
-    query = queries.get(query_type, "")
+# Per-channel queries used by the display page; each takes the channel_id
+DISPLAY_QUERIES = {
+    "channel_info": """
+        SELECT * FROM Channel WHERE channel_id = ?
+    """,
+    "playlists": """
+        SELECT * FROM Playlist WHERE channel_id = ?
+    """,
+    "videos": """
+        SELECT * FROM Video
+        WHERE playlist_id IN (
+            SELECT playlist_id FROM Playlist WHERE channel_id = ?
+        )
+    """,
+    "comments": """
+        SELECT * FROM Comment
+        WHERE video_id IN (
+            SELECT video_id FROM Video
+            WHERE playlist_id IN (
+                SELECT playlist_id FROM Playlist WHERE channel_id = ?
+            )
+        )
+        LIMIT 100
+    """
+}
+
+def tag_query_params(tags):
+    """Builds the parameters for videos_for_tags from a list of raw tag strings."""
+    tag_json = json.dumps(sorted({normalize_tag(tag) for tag in tags if normalize_tag(tag)}))
+    return (tag_json, tag_json)
+
+# Queries that need parameters, with sample parameters for engine parity checks
+PARAMETERIZED_QUERIES = {
+    "videos_for_tags": tag_query_params(["tag1", "tag2"])
+}
+
+def get_query_results(conn, query_type, params=()):
+    query = QUERIES.get(query_type, "")
     if not query:
         raise ValueError(f"Invalid query type: {query_type}")
 
-    return execute_query(conn, query)
+    return execute_query(conn, query, params)
+
+
+# Date-range API. Bounds are datetimes or epoch seconds, half-open [start, end),
+# and always hit the integer published-time indexes.
+BUCKET_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m"
+}
+
+def _range_filter(table, start, end, channel_id):
+    if table == "Video":
+        sql_text = "Video.published_ts >= ? AND Video.published_ts < ?"
+        params = [to_epoch(start), to_epoch(end)]
+        if channel_id:
+            sql_text += " AND Video.playlist_id IN (SELECT playlist_id FROM Playlist WHERE channel_id = ?)"
+            params.append(channel_id)
+    elif table == "Comment":
+        sql_text = "Comment.comment_published_ts >= ? AND Comment.comment_published_ts < ?"
+        params = [to_epoch(start), to_epoch(end)]
+        if channel_id:
+            sql_text += """ AND Comment.video_id IN (
+                SELECT video_id FROM Video
+                WHERE playlist_id IN (SELECT playlist_id FROM Playlist WHERE channel_id = ?)
+            )"""
+            params.append(channel_id)
+    else:
+        raise ValueError(f"Invalid table for date range: {table}")
+    return sql_text, params
+
+def get_videos_between(conn, start, end, channel_id=None):
+    where, params = _range_filter("Video", start, end, channel_id)
+    return execute_query(conn, f"""
+        SELECT * FROM Video WHERE {where} ORDER BY Video.published_ts
+    """, params)
+
+def get_comments_between(conn, start, end, channel_id=None):
+    where, params = _range_filter("Comment", start, end, channel_id)
+    return execute_query(conn, f"""
+        SELECT * FROM Comment WHERE {where} ORDER BY Comment.comment_published_ts
+    """, params)
+
+def get_activity_buckets(conn, start, end, bucket="day", table="Video", channel_id=None):
+    """Counts videos or comments published per day/week/month between start and end."""
+    bucket_format = BUCKET_FORMATS.get(bucket)
+    if not bucket_format:
+        raise ValueError(f"Invalid bucket: {bucket}")
+
+    ts_column = "Video.published_ts" if table == "Video" else "Comment.comment_published_ts"
+    where, params = _range_filter(table, start, end, channel_id)
+    return execute_query(conn, f"""
+        SELECT strftime('{bucket_format}', {ts_column}, 'unixepoch') AS bucket, COUNT(*) AS total
+        FROM {table}
+        WHERE {where}
+        GROUP BY bucket
+        ORDER BY bucket
+    """, params)
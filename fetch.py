@@ -1,9 +1,15 @@
 import googleapiclient.discovery
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 import pandas as pd
+from collections import defaultdict
 from datetime import datetime
+from urllib.parse import urlparse
 import logging
 import os
+import threading
+from data_processing import transform_comment
+from database import insert_comments, get_comment_harvest_state, save_comment_harvest_state
 
 # Ensure logs directory exists
 os.makedirs("logs", exist_ok=True)
@@ -16,16 +22,153 @@ logging.basicConfig(
 )
 
 
-def initialize_youtube_api(api_key):
-    logging.info("Initializing YouTube API client")
-    return googleapiclient.discovery.build("youtube", "v3", developerKey=api_key)
+# Partial-response masks per endpoint as (part, fields). "full" asks for exactly
+# what transform_channel_data and the comment harvester consume; "lean" also
+# drops descriptions and thumbnails; "stats" serves statistics-only refreshes.
+COMMENT_SNIPPET_FIELDS = "textDisplay,authorDisplayName,publishedAt,updatedAt,likeCount"
+FIELD_PROFILES = {
+    "full": {
+        "channels": (
+            "snippet,statistics,contentDetails",
+            "items(id,snippet(title,description),statistics(viewCount,subscriberCount),"
+            "contentDetails/relatedPlaylists/uploads)"
+        ),
+        "playlists": ("snippet", "nextPageToken,items(id,snippet/title)"),
+        "playlistItems": ("snippet", "nextPageToken,items/snippet/resourceId/videoId"),
+        "videos": (
+            "snippet,statistics,contentDetails",
+            "items(id,snippet(title,description,tags,publishedAt,thumbnails/high/url),"
+            "statistics(viewCount,likeCount,dislikeCount,favoriteCount,commentCount),"
+            "contentDetails(duration,caption))"
+        ),
+        "commentThreads": (
+            "snippet",
+            f"nextPageToken,items(id,snippet/topLevelComment/snippet({COMMENT_SNIPPET_FIELDS}))"
+        ),
+        "commentThreadsWithReplies": (
+            "snippet,replies",
+            f"nextPageToken,items(id,snippet(totalReplyCount,topLevelComment/snippet({COMMENT_SNIPPET_FIELDS})),"
+            f"replies/comments(id,snippet({COMMENT_SNIPPET_FIELDS})))"
+        ),
+        "comments": ("snippet", f"nextPageToken,items(id,snippet({COMMENT_SNIPPET_FIELDS}))")
+    },
+    "stats": {
+        "channels": ("statistics", "items(id,statistics(viewCount,subscriberCount))"),
+        "videos": ("statistics", "items(id,statistics(viewCount,likeCount,commentCount))")
+    }
+}
+FIELD_PROFILES["lean"] = dict(
+    FIELD_PROFILES["full"],
+    channels=(
+        "snippet,statistics,contentDetails",
+        "items(id,snippet/title,statistics(viewCount,subscriberCount),contentDetails/relatedPlaylists/uploads)"
+    ),
+    videos=(
+        "snippet,statistics,contentDetails",
+        "items(id,snippet(title,tags,publishedAt),"
+        "statistics(viewCount,likeCount,dislikeCount,favoriteCount,commentCount),"
+        "contentDetails(duration,caption))"
+    )
+)
+# Stored columns a profile does not fetch; existing values are kept on write
+PROFILE_OMITTED_COLUMNS = {
+    "lean": {"Channel": ("channel_description",), "Video": ("video_description", "thumbnail")}
+}
+
+
+def request_fields(endpoint, profile="full"):
+    """Returns the (part, fields) pair for an endpoint under a field profile."""
+    try:
+        return FIELD_PROFILES[profile][endpoint]
+    except KeyError:
+        raise ValueError(f"Field profile '{profile}' does not cover endpoint '{endpoint}'")
+
+
+class TransferStats:
+    """
+    Response bytes after gzip decoding and request counts per endpoint for one
+    API client. Decoded sizes show what field masks save, not bytes on the wire.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(lambda: {"requests": 0, "decoded_bytes": 0, "gzip_responses": 0})
+
+    def record(self, endpoint, size, gzipped):
+        with self.lock:
+            stats = self.endpoints[endpoint]
+            stats["requests"] += 1
+            stats["decoded_bytes"] += size
+            if gzipped:
+                stats["gzip_responses"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {endpoint: dict(stats) for endpoint, stats in self.endpoints.items()}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
 
+def get_transfer_stats(youtube):
+    return youtube.transfer_stats.snapshot()
 
-def fetch_channel_data(youtube, channel_id, max_video_pages=2, max_comment_pages=2):
+
+def reset_transfer_stats(youtube):
+    youtube.transfer_stats.reset()
+
+
+def build_metered_http(transfer_stats):
+    """
+    An httplib2 client that records the payload size of every call in
+    `transfer_stats`. Requests are sent unchanged: googleapiclient already asks
+    for gzip responses (Accept-Encoding and a "(gzip)" user agent).
+    """
+    http = build_http()
+    send = http.request
+
+    def request(uri, method="GET", body=None, headers=None, *args, **kwargs):
+        response, content = send(uri, method, body, headers, *args, **kwargs)
+
+        # httplib2 decodes the body and keeps the original encoding under this key
+        transfer_stats.record(
+            urlparse(uri).path.rsplit("/", 1)[-1],
+            len(content or b""),
+            "gzip" in response.get("-content-encoding", "")
+        )
+        return response, content
+
+    http.request = request
+    return http
+
+
+def initialize_youtube_api(api_key):
+    """Builds a YouTube client whose transfer counters are its own (see get_transfer_stats)."""
+    logging.info("Initializing YouTube API client")
+    transfer_stats = TransferStats()
+    youtube = googleapiclient.discovery.build(
+        "youtube", "v3", developerKey=api_key, http=build_metered_http(transfer_stats)
+    )
+    youtube.transfer_stats = transfer_stats
+    return youtube
+
+
+def fetch_channel_data(youtube, channel_id, max_video_pages=2, max_comment_pages=2, progress_callback=None,
+                       profile="full"):
+    """
+    Fetches a channel with its playlists, videos and comments. If given,
+    `progress_callback(event, payload)` is called as results arrive: "channel"
+    with the channel entry, "playlists" with the playlist list, and "video" with
+    each video's details, so callers can render before the whole fetch is done.
+    `profile` selects the field masks ("full" or "lean") from FIELD_PROFILES.
+    """
     logging.info(f"Fetching channel data for ID: {channel_id}")
     try:
+        part, fields = request_fields("channels", profile)
         response = youtube.channels().list(
-            part="snippet,statistics,contentDetails",
+            part=part,
+            fields=fields,
             id=channel_id
         ).execute()
 
@@ -46,18 +189,24 @@ def fetch_channel_data(youtube, channel_id, max_video_pages=2, max_comment_pages
                 "Playlist_Id": uploads_playlist_id
             }
         }
+        if progress_callback:
+            progress_callback("channel", channel_data[info["snippet"]["title"]])
 
         logging.info("Fetching playlists...")
-        playlists = fetch_playlists(youtube, channel_id)
+        playlists = fetch_playlists(youtube, channel_id, profile=profile)
         playlists.append({
             "Playlist_Id": uploads_playlist_id,
             "Channel_Id": info["id"],
             "Playlist_Name": "Uploads"
         })
         channel_data["Playlists"] = playlists
+        if progress_callback:
+            progress_callback("playlists", playlists)
 
         logging.info("Fetching videos...")
-        videos = fetch_videos(youtube, uploads_playlist_id, max_pages=max_video_pages, comment_pages=max_comment_pages)
+        videos = fetch_videos(youtube, uploads_playlist_id, max_pages=max_video_pages,
+                              comment_pages=max_comment_pages, progress_callback=progress_callback,
+                              profile=profile)
         for video_id, video_details in videos.items():
             channel_data[video_id] = video_details
 
@@ -72,11 +221,13 @@ def fetch_channel_data(youtube, channel_id, max_video_pages=2, max_comment_pages
     return {}
 
 
-def fetch_playlists(youtube, channel_id, max_pages=5):
+def fetch_playlists(youtube, channel_id, max_pages=5, profile="full"):
     playlists = []
     try:
+        part, fields = request_fields("playlists", profile)
         request = youtube.playlists().list(
-            part="snippet",
+            part=part,
+            fields=fields,
             channelId=channel_id,
             maxResults=50
         )
@@ -99,11 +250,13 @@ def fetch_playlists(youtube, channel_id, max_pages=5):
     return playlists
 
 
-def fetch_videos(youtube, playlist_id, max_pages=5, comment_pages=2):
+def fetch_videos(youtube, playlist_id, max_pages=5, comment_pages=2, progress_callback=None, profile="full"):
     videos = {}
     try:
+        part, fields = request_fields("playlistItems", profile)
         request = youtube.playlistItems().list(
-            part="snippet",
+            part=part,
+            fields=fields,
             playlistId=playlist_id,
             maxResults=50
         )
@@ -114,10 +267,12 @@ def fetch_videos(youtube, playlist_id, max_pages=5, comment_pages=2):
             logging.info(f"Fetching videos page {page_count + 1}")
             for item in response.get("items", []):
                 video_id = item["snippet"]["resourceId"]["videoId"]
-                video_data = fetch_video_details(youtube, video_id, comment_pages)
+                video_data = fetch_video_details(youtube, video_id, comment_pages, profile=profile)
                 if video_data:
-                    video_data["Playlist_Id"] = playlist_id  
+                    video_data["Playlist_Id"] = playlist_id
                     videos[video_id] = video_data
+                    if progress_callback:
+                        progress_callback("video", video_data)
             request = youtube.playlistItems().list_next(request, response)
             page_count += 1
 
@@ -127,10 +282,12 @@ def fetch_videos(youtube, playlist_id, max_pages=5, comment_pages=2):
     return videos
 
 
-def fetch_video_details(youtube, video_id, comment_pages=2):
+def fetch_video_details(youtube, video_id, comment_pages=2, profile="full"):
     try:
+        part, fields = request_fields("videos", profile)
         response = youtube.videos().list(
-            part="snippet,statistics,contentDetails",
+            part=part,
+            fields=fields,
             id=video_id
         ).execute()
 
@@ -139,7 +296,7 @@ def fetch_video_details(youtube, video_id, comment_pages=2):
             return {}
 
         video = response["items"][0]
-        thumbnail_url = video["snippet"]["thumbnails"].get("high", {}).get("url", "")
+        thumbnail_url = video["snippet"].get("thumbnails", {}).get("high", {}).get("url", "")
 
         data = {
             "Video_Id": video["id"],
@@ -155,7 +312,7 @@ def fetch_video_details(youtube, video_id, comment_pages=2):
             "Duration": video["contentDetails"]["duration"],
             "Thumbnail": thumbnail_url,
             "Caption_Status": "Available" if video["contentDetails"].get("caption") == "true" else "Not Available",
-            "Comments": fetch_video_comments(youtube, video_id, max_pages=comment_pages)
+            "Comments": fetch_video_comments(youtube, video_id, max_pages=comment_pages, profile=profile)
         }
 
         return data
@@ -164,13 +321,15 @@ def fetch_video_details(youtube, video_id, comment_pages=2):
         return {}
 
 
-def fetch_video_comments(youtube, video_id, max_pages=5):
+def fetch_video_comments(youtube, video_id, max_pages=5, profile="full"):
     comments = {}
     page_count = 0
 
     try:
+        part, fields = request_fields("commentThreads", profile)
         request = youtube.commentThreads().list(
-            part="snippet",
+            part=part,
+            fields=fields,
             videoId=video_id,
             maxResults=50
         )
@@ -184,7 +343,9 @@ def fetch_video_comments(youtube, video_id, max_pages=5):
                     "Comment_Id": comment_id,
                     "Comment_Text": snippet.get("textDisplay", ""),
                     "Comment_Author": snippet.get("authorDisplayName", "Unknown"),
-                    "Comment_PublishedAt": snippet.get("publishedAt", datetime.utcnow().isoformat())
+                    "Comment_PublishedAt": snippet.get("publishedAt", datetime.utcnow().isoformat()),
+                    "Comment_UpdatedAt": snippet.get("updatedAt"),
+                    "Like_Count": int(snippet.get("likeCount", 0))
                 }
             request = youtube.commentThreads().list_next(request, response)
             page_count += 1
@@ -192,13 +353,6 @@ def fetch_video_comments(youtube, video_id, max_pages=5):
     except HttpError as e:
         if e.resp.status == 403 and "commentsDisabled" in str(e):
             logging.warning(f"Comments disabled for video {video_id}")
-            fallback_id = f"{video_id}_NO_COMMENT"
-            comments[fallback_id] = {
-                "Comment_Id": fallback_id,
-                "Comment_Text": "Comments disabled",
-                "Comment_Author": "N/A",
-                "Comment_PublishedAt": datetime.utcnow().isoformat()
-            }
         else:
             logging.error(f"HTTP error while fetching comments for {video_id}: {e}")
     except Exception as e:
@@ -207,6 +361,147 @@ def fetch_video_comments(youtube, video_id, max_pages=5):
     return comments
 
 
+def fetch_comment_replies(youtube, parent_id, max_pages=None, profile="full"):
+    """Yields every reply snippet under a top-level comment via comments.list(parentId=...)."""
+    part, fields = request_fields("comments", profile)
+    request = youtube.comments().list(
+        part=part,
+        fields=fields,
+        parentId=parent_id,
+        maxResults=100
+    )
+    page_count = 0
+    while request and (max_pages is None or page_count < max_pages):
+        response = request.execute()
+        for item in response.get("items", []):
+            yield item["id"], item["snippet"]
+        request = youtube.comments().list_next(request, response)
+        page_count += 1
+
+
+def harvest_video_comments(youtube, conn, video_id, batch_size=500, max_pages=None, profile="full"):
+    """
+    Harvests every comment thread and reply for a video into the Comment table.
+
+    Comments are buffered and flushed in batches of `batch_size`, so memory stays
+    bounded regardless of the comment count. The next page token is saved with
+    each flush; an interrupted harvest resumes from the last flushed page and
+    re-fetched rows are simply replaced. Returns the number of comments written.
+    """
+    page_token, completed = get_comment_harvest_state(conn, video_id)
+    if completed:
+        logging.info(f"Comments for video {video_id} already harvested.")
+        return 0
+
+    buffer = []
+    written = 0
+    page_count = 0
+    part, fields = request_fields("commentThreadsWithReplies", profile)
+
+    def flush(next_token, done=False):
+        nonlocal buffer, written
+        insert_comments(conn, buffer, commit=False)
+        save_comment_harvest_state(conn, video_id, next_token, completed=done, commit=False)
+        conn.commit()
+        written += len(buffer)
+        buffer = []
+
+    try:
+        while max_pages is None or page_count < max_pages:
+            response = youtube.commentThreads().list(
+                part=part,
+                fields=fields,
+                videoId=video_id,
+                maxResults=100,
+                pageToken=page_token
+            ).execute()
+
+            for item in response.get("items", []):
+                thread_id = item["id"]
+                top_level = item["snippet"]["topLevelComment"]["snippet"]
+                buffer.append(transform_comment(thread_id, video_id, top_level))
+
+                # Threads only embed a handful of replies; page the rest explicitly
+                inline_replies = item.get("replies", {}).get("comments", [])
+                if item["snippet"].get("totalReplyCount", 0) > len(inline_replies):
+                    replies = fetch_comment_replies(youtube, thread_id, profile=profile)
+                else:
+                    replies = ((reply["id"], reply["snippet"]) for reply in inline_replies)
+                for reply_id, reply_snippet in replies:
+                    buffer.append(transform_comment(reply_id, video_id, reply_snippet, parent_id=thread_id))
+                    if len(buffer) >= batch_size:
+                        # Mid-page flush keeps the current token: a resume redoes this page
+                        flush(page_token)
+
+                if len(buffer) >= batch_size:
+                    flush(page_token)
+
+            page_token = response.get("nextPageToken")
+            page_count += 1
+
+            if not page_token:
+                flush(None, done=True)
+                logging.info(f"Harvested {written} comments for video {video_id}.")
+                return written
+            if not buffer:
+                save_comment_harvest_state(conn, video_id, page_token)
+
+        # Page budget exhausted; checkpoint so the next call continues from here
+        flush(page_token)
+
+    except HttpError as e:
+        conn.rollback()
+        if e.resp.status == 403 and "commentsDisabled" in str(e):
+            logging.warning(f"Comments disabled for video {video_id}")
+            save_comment_harvest_state(conn, video_id, None, completed=True)
+        else:
+            logging.error(f"HTTP error while harvesting comments for {video_id}: {e}")
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Unexpected error harvesting comments for {video_id}: {e}")
+
+    logging.info(f"Harvested {written} comments for video {video_id} (incomplete).")
+    return written
+
+
+def refresh_statistics(youtube, channel_id, video_ids, profile="stats"):
+    """
+    Re-fetches only the counters of a channel and its videos, 50 videos per
+    request. Returns (channel, videos) in the shape record_snapshots and
+    update_statistics expect; channel is None if the channel was not found.
+    """
+    channel = None
+    videos = []
+    try:
+        part, fields = request_fields("channels", profile)
+        response = youtube.channels().list(part=part, fields=fields, id=channel_id).execute()
+        if response.get("items"):
+            statistics = response["items"][0].get("statistics", {})
+            channel = {"channel_id": channel_id, "channel_views": int(statistics.get("viewCount", 0))}
+
+        part, fields = request_fields("videos", profile)
+        for start in range(0, len(video_ids), 50):
+            response = youtube.videos().list(
+                part=part,
+                fields=fields,
+                id=",".join(video_ids[start:start + 50])
+            ).execute()
+            for item in response.get("items", []):
+                statistics = item.get("statistics", {})
+                videos.append({
+                    "video_id": item["id"],
+                    "view_count": int(statistics.get("viewCount", 0)),
+                    "like_count": int(statistics.get("likeCount", 0)),
+                    "comment_count": int(statistics.get("commentCount", 0))
+                })
+        logging.info(f"Refreshed statistics for channel {channel_id} and {len(videos)} videos.")
+    except HttpError as e:
+        logging.error(f"HTTP error during statistics refresh: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error during statistics refresh: {e}")
+    return channel, videos
+
+
 def dict_to_dataframe(data_dict):
     """Converts a flat dictionary to a single-row pandas DataFrame."""
     return pd.DataFrame([data_dict])
@@ -0,0 +1,287 @@
+"""
+Concurrent-user load test for the database layer behind the Streamlit pages.
+
+Simulates N sessions running the same calls as the display and query pages
+(execute_query, get_query_results, DISPLAY_QUERIES) while a writer thread
+ingests synthetic channels, then reports throughput, latency percentiles and
+'database is locked' errors per operation.
+
+    python load_test.py --sessions 16 --duration 30 --channels 20 --videos-per-channel 500
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3 as sql
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from database import (
+    connect_to_db, create_tables, store_channel_data, execute_query, get_query_results,
+    tag_query_params, QUERIES, PARAMETERIZED_QUERIES, DISPLAY_QUERIES
+)
+
+TAG_POOL = [f"tag{i}" for i in range(200)]
+
+
+def synthetic_channel(rng, channel_index, videos_per_channel, comments_per_video, prefix="C"):
+    channel_id = f"{prefix}{channel_index}"
+    playlist_id = f"PL_{channel_id}"
+    base_date = datetime(2024, 1, 1)
+    videos = []
+    comments = []
+    for v in range(videos_per_channel):
+        video_id = f"{channel_id}_V{v}"
+        published = base_date + timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))
+        videos.append({
+            "video_id": video_id,
+            "playlist_id": playlist_id,
+            "video_name": f"Video {v} of channel {channel_index}",
+            "video_description": "Synthetic video description " * 5,
+            "published_date": published,
+            "view_count": rng.randint(0, 10_000_000),
+            "like_count": rng.randint(0, 100_000),
+            "dislike_count": 0,
+            "favorite_count": 0,
+            "comment_count": rng.randint(0, 10_000),
+            "duration": rng.randint(30, 7200),
+            "thumbnail": "",
+            "caption": "Not Available",
+            "tags": rng.sample(TAG_POOL, 5)
+        })
+        for c in range(comments_per_video):
+            comments.append({
+                "comment_id": f"{video_id}_K{c}",
+                "video_id": video_id,
+                "comment_text": "Synthetic comment text " * 3,
+                "comment_author": f"user{rng.randint(0, 100_000)}",
+                "comment_published_date": published + timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            })
+    return {
+        "channel": {
+            "channel_id": channel_id,
+            "channel_name": f"Channel {channel_index}",
+            "channel_type": "N/A",
+            "channel_views": rng.randint(0, 100_000_000),
+            "channel_description": "",
+            "channel_status": "Active"
+        },
+        "playlists": [{"playlist_id": playlist_id, "channel_id": channel_id, "playlist_name": "Uploads"}],
+        "videos": videos,
+        "comments": comments
+    }
+
+
+def generate_database(db_path, channels, videos_per_channel, comments_per_video, seed=42):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = connect_to_db(db_path)
+    create_tables(conn)
+    rng = random.Random(seed)
+    for i in range(channels):
+        store_channel_data(conn, synthetic_channel(rng, i, videos_per_channel, comments_per_video))
+    conn.close()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.locked_errors = defaultdict(int)
+        self.other_errors = defaultdict(int)
+
+    def record(self, op, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except sql.OperationalError as e:
+            with self.lock:
+                if "locked" in str(e) or "busy" in str(e):
+                    self.locked_errors[op] += 1
+                else:
+                    self.other_errors[op] += 1
+            return
+        except Exception:
+            with self.lock:
+                self.other_errors[op] += 1
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.latencies[op].append(elapsed_ms)
+
+
+def session_operations(conn, rng, channel_ids):
+    """One simulated page interaction, chosen with a mix similar to real use."""
+    channel_id = rng.choice(channel_ids)
+    query_types = [q for q in QUERIES if q not in PARAMETERIZED_QUERIES]
+    choice = rng.random()
+    if choice < 0.1:
+        return "display:channel_list", lambda: execute_query(conn, "SELECT channel_id, channel_name FROM Channel")
+    if choice < 0.5:
+        name = rng.choice(list(DISPLAY_QUERIES))
+        return f"display:{name}", lambda: execute_query(conn, DISPLAY_QUERIES[name], (channel_id,))
+    if choice < 0.9:
+        query_type = rng.choice(query_types)
+        return f"query:{query_type}", lambda: get_query_results(conn, query_type)
+    params = tag_query_params(rng.sample(TAG_POOL, 2))
+    return "query:videos_for_tags", lambda: get_query_results(conn, "videos_for_tags", params)
+
+
+def run_session(conn_factory, shared_conn, stats, stop, seed, channel_ids, busy_timeout_ms):
+    rng = random.Random(seed)
+    conn = shared_conn or conn_factory()
+    if not shared_conn:
+        conn.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+    while not stop.is_set():
+        op, fn = session_operations(conn, rng, channel_ids)
+        stats.record(op, fn)
+    if not shared_conn:
+        conn.close()
+
+
+def run_writer(conn_factory, stats, stop, videos_per_batch, comments_per_video, busy_timeout_ms, pause):
+    rng = random.Random(7)
+    conn = conn_factory()
+    conn.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+    batch = 0
+    while not stop.is_set():
+        data = synthetic_channel(rng, batch, videos_per_batch, comments_per_video, prefix="W")
+        stats.record("write:store_channel_data", lambda: store_channel_data(conn, data))
+        batch += 1
+        if pause:
+            time.sleep(pause)
+    conn.close()
+
+
+def run_load_test(db_path, sessions, duration, shared_connection=False, writer=True,
+                  writer_videos=200, writer_comments=20, writer_pause=0.0, busy_timeout_ms=5000, seed=1):
+    conn_factory = lambda: connect_to_db(db_path)
+    setup = conn_factory()
+    channel_ids = [row["channel_id"] for row in execute_query(setup, "SELECT channel_id FROM Channel")]
+    setup.close()
+    if not channel_ids:
+        raise ValueError(f"No channels in {db_path}; generate a database first.")
+
+    stats = Stats()
+    stop = threading.Event()
+    shared_conn = None
+    if shared_connection:
+        shared_conn = conn_factory()
+        shared_conn.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+
+    threads = [
+        threading.Thread(
+            target=run_session,
+            args=(conn_factory, shared_conn, stats, stop, seed + i, channel_ids, busy_timeout_ms),
+            daemon=True
+        )
+        for i in range(sessions)
+    ]
+    if writer:
+        threads.append(threading.Thread(
+            target=run_writer,
+            args=(conn_factory, stats, stop, writer_videos, writer_comments, busy_timeout_ms, writer_pause),
+            daemon=True
+        ))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if shared_conn:
+        shared_conn.close()
+
+    return summarize(stats, elapsed)
+
+
+def summarize(stats, elapsed):
+    report = {"elapsed_s": round(elapsed, 2), "operations": {}}
+    ops = set(stats.latencies) | set(stats.locked_errors) | set(stats.other_errors)
+    total_ok = 0
+    for op in sorted(ops):
+        latencies = sorted(stats.latencies.get(op, []))
+        total_ok += len(latencies)
+        report["operations"][op] = {
+            "count": len(latencies),
+            "throughput_per_s": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "locked_errors": stats.locked_errors.get(op, 0),
+            "other_errors": stats.other_errors.get(op, 0)
+        }
+    report["total_throughput_per_s"] = round(total_ok / elapsed, 2)
+    report["total_locked_errors"] = sum(stats.locked_errors.values())
+    report["total_other_errors"] = sum(stats.other_errors.values())
+    return report
+
+
+def print_report(report):
+    header = f"{'operation':<40}{'count':>8}{'ops/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'locked':>8}{'errors':>8}"
+    print(header)
+    print("-" * len(header))
+    for op, row in report["operations"].items():
+        print(
+            f"{op:<40}{row['count']:>8}{row['throughput_per_s']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+            f"{row['p99_ms']:>9}{row['max_ms']:>9}{row['locked_errors']:>8}{row['other_errors']:>8}"
+        )
+    print("-" * len(header))
+    print(
+        f"Elapsed {report['elapsed_s']} s, {report['total_throughput_per_s']} ops/s, "
+        f"{report['total_locked_errors']} 'database is locked' errors, {report['total_other_errors']} other errors "
+        f"(latencies in ms)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the database layer with concurrent sessions.")
+    parser.add_argument("--db", default="loadtest.db", help="SQLite file to test against")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the synthetic database first")
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--videos-per-channel", type=int, default=200)
+    parser.add_argument("--comments-per-video", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds to run")
+    parser.add_argument("--shared-connection", action="store_true",
+                        help="All sessions share one connection, like a single session_state conn")
+    parser.add_argument("--no-writer", action="store_true", help="Disable the concurrent ingestion writer")
+    parser.add_argument("--writer-videos", type=int, default=200, help="Videos per writer batch")
+    parser.add_argument("--writer-pause", type=float, default=0.0, help="Seconds between writer batches")
+    parser.add_argument("--busy-timeout", type=int, default=5000, help="SQLite busy timeout in ms")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.regenerate or not os.path.exists(args.db):
+        print(f"Generating {args.db}: {args.channels} channels x {args.videos_per_channel} videos "
+              f"x {args.comments_per_video} comments...")
+        generate_database(args.db, args.channels, args.videos_per_channel, args.comments_per_video)
+
+    report = run_load_test(
+        args.db, args.sessions, args.duration,
+        shared_connection=args.shared_connection,
+        writer=not args.no_writer,
+        writer_videos=args.writer_videos,
+        writer_pause=args.writer_pause,
+        busy_timeout_ms=args.busy_timeout
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import argparse
+import logging
+import os
+import sqlite3 as sql
+import time
+import uuid
+from database import connect_to_db, iter_query, execute_query
+
+# Parquet archiving is optional: without pyarrow, retention only runs in-place cleanup
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Comments kept per video in the live Comment table; older ones are archived when
+# maintenance runs (python maintenance.py), never during a fetch
+COMMENT_RETENTION_PER_VIDEO = int(os.environ.get("COMMENT_RETENTION_PER_VIDEO", 1000))
+ARCHIVE_DIR = "archive"
+
+ARCHIVE_COLUMNS = [
+    ("comment_id", "string"),
+    ("video_id", "string"),
+    ("comment_text", "string"),
+    ("comment_author", "string"),
+    ("comment_published_date", "string"),
+    ("comment_published_ts", "int64"),
+    ("parent_id", "string"),
+    ("like_count", "int64"),
+    ("updated_at", "string")
+]
+
+
+def enable_incremental_vacuum(conn):
+    """
+    Switches the database to incremental auto-vacuum. Existing files need one
+    full VACUUM to convert, so this only rewrites the file the first time.
+    """
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode == 2:
+        return False
+    conn.commit()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    logging.info("Converted database to incremental auto-vacuum.")
+    return True
+
+
+def incremental_vacuum(conn, max_pages=None):
+    """Returns up to `max_pages` free pages (all by default) to the filesystem."""
+    freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    pragma = f"PRAGMA incremental_vacuum({int(max_pages)})" if max_pages else "PRAGMA incremental_vacuum"
+    # The pragma frees one page per step, and execute() only steps statements
+    # without result columns once; executescript runs it to completion
+    conn.commit()
+    conn.executescript(pragma + ";")
+    freed = freelist - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    logging.info(f"Incremental vacuum freed {freed} pages.")
+    return freed
+
+
+def _channel_videos(channel_id):
+    """Returns a subquery selecting video ids, limited to one channel when given, and its params."""
+    if channel_id is None:
+        return "SELECT video_id FROM Video", ()
+    return """
+        SELECT video_id FROM Video
+        WHERE playlist_id IN (SELECT playlist_id FROM Playlist WHERE channel_id = ?)
+    """, (channel_id,)
+
+
+def purge_placeholder_comments(conn, channel_id=None):
+    """
+    Deletes the synthetic '<video_id>_NO_COMMENT' rows that older versions wrote
+    for videos with comments disabled, optionally for one channel only.
+    """
+    videos, params = _channel_videos(channel_id)
+    # Builds the candidate ids so each delete is a primary-key lookup
+    cursor = conn.execute(f"""
+        DELETE FROM Comment WHERE comment_id IN (SELECT video_id || '_NO_COMMENT' FROM ({videos}))
+    """, params)
+    conn.commit()
+    logging.info(f"Purged {cursor.rowcount} placeholder comments.")
+    return cursor.rowcount
+
+
+def archive_old_comments(conn, keep_latest=COMMENT_RETENTION_PER_VIDEO, archive_dir=ARCHIVE_DIR,
+                         batch_size=5000, channel_id=None):
+    """
+    Moves all but the newest `keep_latest` comments of each video into a
+    ZSTD-compressed Parquet file in `archive_dir`, then deletes them from the
+    Comment table. Rows are streamed in batches and only deleted once the file
+    is safely written. With `channel_id`, only that channel's videos are
+    scanned. Returns the number of comments archived.
+    """
+    if pq is None:
+        raise ImportError("Archiving comments requires the 'pyarrow' package.")
+
+    column_names = [name for name, _ in ARCHIVE_COLUMNS]
+    schema = pa.schema([(name, getattr(pa, col_type)()) for name, col_type in ARCHIVE_COLUMNS])
+    videos, params = _channel_videos(channel_id)
+    query = f"""
+        SELECT {", ".join(column_names)} FROM (
+            SELECT Comment.*, ROW_NUMBER() OVER (
+                PARTITION BY video_id ORDER BY comment_published_ts DESC, comment_id
+            ) AS recency
+            FROM Comment
+            WHERE video_id IN ({videos})
+        )
+        WHERE recency > ?
+        ORDER BY video_id, comment_published_ts
+    """
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"comments_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex}.parquet")
+    tmp_path = path + ".tmp"
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archived_comment_ids (comment_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.archived_comment_ids")
+
+    archived = 0
+    writer = None
+    try:
+        for batch in iter_query(conn, query, (*params, keep_latest), batch_size=batch_size):
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+            columns = {name: [row[name] for row in batch] for name in column_names}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.archived_comment_ids VALUES (?)",
+                [(row["comment_id"],) for row in batch]
+            )
+            archived += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if archived:
+        os.replace(tmp_path, path)
+        conn.execute("DELETE FROM Comment WHERE comment_id IN (SELECT comment_id FROM temp.archived_comment_ids)")
+    conn.execute("DELETE FROM temp.archived_comment_ids")
+    conn.commit()
+    logging.info(f"Archived {archived} comments to {path if archived else archive_dir}.")
+    return archived
+
+
+def query_comment_archive(archive_dir=ARCHIVE_DIR, video_id=None):
+    """Reads archived comments, optionally for one video, as a list of dicts."""
+    if pq is None:
+        raise ImportError("Reading archived comments requires the 'pyarrow' package.")
+    files = sorted(
+        os.path.join(archive_dir, name) for name in os.listdir(archive_dir) if name.endswith(".parquet")
+    ) if os.path.isdir(archive_dir) else []
+    if not files:
+        return []
+
+    # Row-group statistics let the reader skip files and groups without this video
+    filters = [("video_id", "=", video_id)] if video_id else None
+    table = pq.read_table(files, filters=filters)
+    return table.to_pylist()
+
+
+def get_video_comments(conn, video_id, include_archive=True, archive_dir=ARCHIVE_DIR):
+    """Returns a video's comments from hot storage, plus archived ones when requested."""
+    comments = execute_query(conn, """
+        SELECT * FROM Comment WHERE video_id = ? ORDER BY comment_published_ts DESC
+    """, (video_id,))
+    if include_archive and pq is not None:
+        archived = query_comment_archive(archive_dir, video_id)
+        comments.extend(sorted(archived, key=lambda c: c["comment_published_ts"] or 0, reverse=True))
+    return comments
+
+
+def run_maintenance(conn, keep_latest=COMMENT_RETENTION_PER_VIDEO, archive_dir=ARCHIVE_DIR,
+                    vacuum_pages=None, channel_id=None):
+    """
+    Runs placeholder cleanup, comment retention and incremental vacuum, first
+    converting the file to incremental auto-vacuum if needed. Cleanup and
+    retention are limited to `channel_id` when given. Returns a summary.
+    """
+    summary = {"placeholders_purged": purge_placeholder_comments(conn, channel_id), "comments_archived": 0}
+    if keep_latest is not None:
+        if pq is None:
+            logging.warning("pyarrow is not installed; skipping comment archival.")
+        else:
+            summary["comments_archived"] = archive_old_comments(conn, keep_latest, archive_dir,
+                                                                   channel_id=channel_id)
+
+    # Files created before auto-vacuum was configured are converted on the first run
+    try:
+        summary["vacuum_converted"] = enable_incremental_vacuum(conn)
+    except sql.OperationalError as e:
+        # VACUUM needs exclusive access; another session reading retries the next time
+        summary["vacuum_converted"] = False
+        logging.warning(f"Could not convert to incremental auto-vacuum yet: {e}")
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        summary["pages_freed"] = incremental_vacuum(conn, vacuum_pages)
+    else:
+        summary["pages_freed"] = 0
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Archive old comments to Parquet and reclaim free pages in a SQLite database."
+    )
+    parser.add_argument("--db", default="youtube_data.db", help="SQLite database (or shard file) to maintain")
+    parser.add_argument("--channel-id", default=None, help="Limit comment cleanup and retention to one channel")
+    parser.add_argument("--keep-latest", type=int, default=COMMENT_RETENTION_PER_VIDEO,
+                        help="Comments kept per video; older ones are archived (default: %(default)s)")
+    parser.add_argument("--no-archive", action="store_true", help="Skip comment archival")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Directory for archived comment files")
+    parser.add_argument("--vacuum-pages", type=int, default=None,
+                        help="Free pages to reclaim (default: all)")
+    args = parser.parse_args()
+
+    conn = connect_to_db(args.db)
+    try:
+        summary = run_maintenance(
+            conn, None if args.no_archive else args.keep_latest, args.archive_dir,
+            args.vacuum_pages, args.channel_id
+        )
+    finally:
+        conn.close()
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import streamlit as st
 from database import create_tables, connect_to_db
+from sharding import connect_federated
 from fetch import initialize_youtube_api
 
 # Read API key securely from Streamlit Secrets
@@ -16,6 +17,19 @@ with st.expander("Show Loaded Configuration"):
         st.warning("API Key is not loaded.")
     st.write("Using SQLite database: youtube_data.db")
 
+# Storage mode
+storage_mode = st.radio(
+    "Storage mode",
+    ["Single database file", "Sharded (hash-bucketed files)"],
+    help="Sharded storage lets several ingestion processes write at the same time."
+)
+shard_buckets = 0
+if storage_mode.startswith("Sharded"):
+    shard_buckets = st.number_input(
+        "Hash buckets (0 = one file per channel, limited to 10 channels)",
+        min_value=0, max_value=10, value=8
+    )
+
 # Initialization logic
 if st.button("Initialize API and Database"):
     # Initialize YouTube API
@@ -34,8 +48,14 @@ if st.button("Initialize API and Database"):
 
     # Connect to SQLite and create tables
     try:
-        conn = connect_to_db()
-        create_tables(conn)
+        if storage_mode.startswith("Sharded"):
+            conn = connect_federated("shards")
+            st.session_state["shard_dir"] = "shards"
+            st.session_state["shard_buckets"] = shard_buckets or None
+        else:
+            conn = connect_to_db()
+            create_tables(conn)
+            st.session_state.pop("shard_dir", None)
         st.session_state["conn"] = conn
         st.success("SQLite database connected and tables created.")
     except Exception as e:
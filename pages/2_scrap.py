@@ -1,8 +1,13 @@
 import streamlit as st
 import pandas as pd
 from data_processing import transform_channel_data
-from fetch import fetch_channel_data
-from database import insert_channel, insert_playlist, insert_videos, insert_comments
+from fetch import (
+    fetch_channel_data, harvest_video_comments, refresh_statistics, get_transfer_stats, reset_transfer_stats,
+    PROFILE_OMITTED_COLUMNS
+)
+from database import store_channel_data, update_statistics, execute_query
+from sharding import connect_to_shard, refresh_federated, check_shard_capacity, shard_path
+from stats_history import record_snapshots, rollup_snapshots
 
 # Page title
 st.title("Fetch and Store YouTube Data")
@@ -24,17 +29,86 @@ st.success("YouTube API and database connection are ready.")
 
 # User input for channel ID
 channel_id = st.text_input("Enter YouTube Channel ID")
-
-def fetch_and_store_data(youtube, conn, channel_id):
+harvest_all_comments = st.checkbox(
+    "Harvest all comments and replies (slow for large channels; resumes where it left off)"
+)
+field_profile = st.radio(
+    "API payload",
+    ["full", "lean"],
+    horizontal=True,
+    help="'lean' skips channel/video descriptions and thumbnails to cut download size; "
+         "already stored descriptions and thumbnails are kept."
+)
+
+def show_transfer_stats():
+    transfer_stats = get_transfer_stats(youtube)
+    if transfer_stats:
+        with st.expander("API transfer statistics"):
+            st.dataframe(pd.DataFrame.from_dict(transfer_stats, orient="index"))
+            st.write("Total decoded bytes received:", sum(s["decoded_bytes"] for s in transfer_stats.values()))
+
+def get_write_conn(conn, channel_id):
+    """In sharded mode each channel is written to its own file; conn only reads."""
+    shard_dir = st.session_state.get("shard_dir")
+    if shard_dir:
+        return connect_to_shard(channel_id, shard_dir, st.session_state.get("shard_buckets"))
+    return conn
+
+# Large tables are rendered from a bounded preview rather than full DataFrames
+PREVIEW_ROWS = 200
+
+def render_preview(title, rows, limit=PREVIEW_ROWS):
+    st.subheader(title)
+    st.dataframe(pd.DataFrame(rows[:limit]))
+    if len(rows) > limit:
+        st.caption(f"Showing {limit} of {len(rows)} rows.")
+
+def fetch_and_store_data(youtube, conn, channel_id, harvest_all_comments=False, field_profile="full"):
     try:
-        st.info("Fetching channel data...")
-        channel_data = fetch_channel_data(youtube, channel_id)
+        # Fail before spending API quota if sharded storage has no room for this channel
+        shard_dir = st.session_state.get("shard_dir")
+        if shard_dir:
+            check_shard_capacity(
+                [shard_path(channel_id, shard_dir, st.session_state.get("shard_buckets"))], shard_dir
+            )
+
+        progress_text = st.empty()
+        progress_text.info("Fetching channel data...")
+        channel_placeholder = st.empty()
+        videos_placeholder = st.empty()
+        live_rows = []
+
+        # Render results as the API calls land instead of after the whole fetch
+        def on_progress(event, payload):
+            if event == "channel":
+                with channel_placeholder.container():
+                    st.subheader("Channel Info")
+                    st.json(payload)
+            elif event == "playlists":
+                progress_text.info(f"Found {len(payload)} playlists. Fetching videos...")
+            elif event == "video":
+                live_rows.append({
+                    "Video_Id": payload["Video_Id"],
+                    "Video_Name": payload["Video_Name"],
+                    "PublishedAt": payload["PublishedAt"],
+                    "View_Count": payload["View_Count"],
+                    "Like_Count": payload["Like_Count"],
+                    "Comment_Count": payload["Comment_Count"]
+                })
+                progress_text.info(f"Fetched {len(live_rows)} videos...")
+                if len(live_rows) <= PREVIEW_ROWS:
+                    with videos_placeholder.container():
+                        st.subheader("Videos (live)")
+                        st.dataframe(pd.DataFrame(live_rows))
+
+        channel_data = fetch_channel_data(youtube, channel_id, progress_callback=on_progress, profile=field_profile)
 
         if not channel_data:
             st.error("No data found. Please check the Channel ID.")
             return
 
         # Transform and clean data
+        progress_text.info(f"Fetched {len(live_rows)} videos. Storing...")
         cleaned_data = transform_channel_data(channel_data)
 
         # Debug counts (very important)
@@ -46,44 +120,89 @@ def fetch_and_store_data(youtube, conn, channel_id):
             st.warning("No videos were extracted. Queries will return empty results.")
             return
 
-        # Insert into database
-        insert_channel(conn, cleaned_data["channel"])
+        write_conn = get_write_conn(conn, channel_id)
+
+        # Insert into database (commits for SQLite persistence)
+        store_channel_data(write_conn, cleaned_data, PROFILE_OMITTED_COLUMNS.get(field_profile))
 
-        for playlist in cleaned_data["playlists"]:
-            insert_playlist(conn, playlist)
+        # Keep a growth history of the counters that were just overwritten
+        record_snapshots(write_conn, cleaned_data["channel"], cleaned_data["videos"])
+        rollup_snapshots(write_conn)
 
-        insert_videos(conn, cleaned_data["videos"])
-        insert_comments(conn, cleaned_data["comments"])
+        if harvest_all_comments:
+            progress = st.progress(0.0, text="Harvesting comments and replies...")
+            total_harvested = 0
+            for i, video in enumerate(cleaned_data["videos"], start=1):
+                total_harvested += harvest_video_comments(youtube, write_conn, video["video_id"],
+                                                          profile=field_profile)
+                progress.progress(i / len(cleaned_data["videos"]),
+                                  text=f"Harvested {total_harvested} comments from {i} videos")
+            st.write("Total Comments Harvested:", total_harvested)
 
-        # REQUIRED for SQLite persistence
-        conn.commit()
+        if shard_dir:
+            write_conn.close()
+            refresh_federated(conn, shard_dir)
 
         # Verify insert (debug safety)
         video_check = pd.read_sql("SELECT COUNT(*) AS total FROM Video", conn)
         st.write("Videos currently in DB:", video_check["total"].iloc[0])
 
-        st.success("Data fetched and stored successfully. You can now proceed to querying.")
+        progress_text.success("Data fetched and stored successfully. You can now proceed to querying.")
 
-        # Display results
-        st.subheader("Channel Info")
-        st.json(cleaned_data["channel"])
+        # Display results (channel info is already shown above)
+        render_preview("Playlists", cleaned_data["playlists"])
 
-        st.subheader("Playlists")
-        st.dataframe(pd.DataFrame(cleaned_data["playlists"]))
+        videos_placeholder.empty()
+        render_preview("Videos", cleaned_data["videos"])
 
-        st.subheader("Videos")
-        st.dataframe(pd.DataFrame(cleaned_data["videos"]))
+        render_preview("Comments (showing up to 50)", cleaned_data["comments"], limit=50)
 
-        st.subheader("Comments (showing up to 50)")
-        st.dataframe(pd.DataFrame(cleaned_data["comments"]).head(50))
+        show_transfer_stats()
 
     except Exception as e:
         st.error(f"Error while processing data: {e}")
 
-# Run when user clicks the button
-if st.button("Fetch and Store Data"):
+def refresh_channel_statistics(youtube, conn, channel_id):
+    try:
+        # Look up on the read connection first: opening a shard for an unknown
+        # channel would create an empty file that takes one of the attach slots
+        video_ids = [row["video_id"] for row in execute_query(conn, """
+            SELECT video_id FROM Video
+            WHERE playlist_id IN (SELECT playlist_id FROM Playlist WHERE channel_id = ?)
+        """, (channel_id,))]
+        if not video_ids:
+            st.warning("This channel has no stored videos. Use 'Fetch and Store Data' first.")
+            return
+
+        write_conn = get_write_conn(conn, channel_id)
+        channel, videos = refresh_statistics(youtube, channel_id, video_ids)
+        update_statistics(write_conn, channel, videos)
+        record_snapshots(write_conn, channel, videos)
+        rollup_snapshots(write_conn)
+
+        if st.session_state.get("shard_dir"):
+            write_conn.close()
+            refresh_federated(conn, st.session_state["shard_dir"])
+
+        st.success(f"Refreshed statistics for {len(videos)} videos.")
+        show_transfer_stats()
+    except Exception as e:
+        st.error(f"Error while refreshing statistics: {e}")
+
+# Run when user clicks a button
+col_fetch, col_refresh = st.columns(2)
+if col_fetch.button("Fetch and Store Data"):
     if not channel_id.strip():
         st.warning("Please enter a valid YouTube Channel ID.")
     else:
+        reset_transfer_stats(youtube)
         with st.spinner("Processing..."):
-            fetch_and_store_data(youtube, conn, channel_id)
+            fetch_and_store_data(youtube, conn, channel_id, harvest_all_comments, field_profile)
+
+if col_refresh.button("Refresh Statistics Only"):
+    if not channel_id.strip():
+        st.warning("Please enter a valid YouTube Channel ID.")
+    else:
+        reset_transfer_stats(youtube)
+        with st.spinner("Refreshing statistics..."):
+            refresh_channel_statistics(youtube, conn, channel_id)
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 from zipfile import ZipFile
-from database import execute_query
+from database import execute_query, DISPLAY_QUERIES
+from stats_history import get_channel_views_series
 
 # Page title
 st.title("View Stored YouTube Channel Data")
@@ -56,37 +57,27 @@ if st.button("Display"):
     with st.spinner("Fetching stored data from the database..."):
 
         # Channel Info
-        df_channel = display_query_result("Channel Info", """
-            SELECT * FROM Channel WHERE channel_id = ?
-        """, (selected_channel_id,))
+        df_channel = display_query_result("Channel Info", DISPLAY_QUERIES["channel_info"], (selected_channel_id,))
         results_for_zip["channel_info.csv"] = df_channel
 
+        # Channel views history from stored snapshots
+        views_series = get_channel_views_series(conn, selected_channel_id)
+        if len(views_series) > 1:
+            st.subheader("Channel Views Over Time")
+            df_views = pd.DataFrame(views_series)
+            df_views["ts"] = pd.to_datetime(df_views["ts"], unit="s")
+            st.line_chart(df_views.set_index("ts")["value"])
+
         # Playlists
-        df_playlist = display_query_result("Playlists", """
-            SELECT * FROM Playlist WHERE channel_id = ?
-        """, (selected_channel_id,))
+        df_playlist = display_query_result("Playlists", DISPLAY_QUERIES["playlists"], (selected_channel_id,))
         results_for_zip["playlists.csv"] = df_playlist
 
         # Videos (no filters)
-        df_videos = display_query_result("Videos", """
-            SELECT * FROM Video
-            WHERE playlist_id IN (
-                SELECT playlist_id FROM Playlist WHERE channel_id = ?
-            )
-        """, (selected_channel_id,))
+        df_videos = display_query_result("Videos", DISPLAY_QUERIES["videos"], (selected_channel_id,))
         results_for_zip["videos.csv"] = df_videos
 
         # Comments (limited)
-        df_comments = display_query_result("Comments (limited to 100)", """
-            SELECT * FROM Comment
-            WHERE video_id IN (
-                SELECT video_id FROM Video
-                WHERE playlist_id IN (
-                    SELECT playlist_id FROM Playlist WHERE channel_id = ?
-                )
-            )
-            LIMIT 100
-        """, (selected_channel_id,))
+        df_comments = display_query_result("Comments (limited to 100)", DISPLAY_QUERIES["comments"], (selected_channel_id,))
         results_for_zip["comments.csv"] = df_comments
 
         # Export all as ZIP
@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
-from database import get_query_results
+from database import get_query_results, get_slow_queries, tag_query_params, SLOW_QUERY_THRESHOLD_MS
+from analytics import (
+    duckdb_available, sqlite_extension_available, connect_analytics, get_db_path, get_query_results_duckdb,
+    check_backend_parity
+)
 
 # Page title
 st.title("Database Query Interface")
@@ -22,18 +26,46 @@ query_options = {
     "What is the total number of views for each channel?": "channel_total_views",
     "Which channels have published videos in 2026?": "channels_published_2026",
     "What is the average duration of all videos in each channel?": "average_video_duration",
-    "Which videos have the highest number of comments, and what are their channels?": "most_commented_videos"
+    "Which videos have the highest number of comments, and what are their channels?": "most_commented_videos",
+    "What are the top tags in each channel?": "top_tags_per_channel",
+    "Which tags are most often used together?": "tag_cooccurrence",
+    "Which videos have all of the given tags, across channels?": "videos_for_tags"
 }
 
 # Query selector
 query_label = st.selectbox("Select a query to execute", list(query_options.keys()))
 query_type = query_options[query_label]
 
+# Tag input for tag-set queries
+params = ()
+if query_type == "videos_for_tags":
+    tags_input = st.text_input("Tags (comma-separated)")
+    params = tag_query_params(tags_input.split(","))
+
+# Query engine (DuckDB is optional; sharded storage has no single file to attach)
+engines = ["SQLite"]
+if duckdb_available() and not st.session_state.get("shard_dir"):
+    if sqlite_extension_available():
+        engines.append("DuckDB")
+    else:
+        st.caption("DuckDB engine unavailable: its sqlite extension could not be installed on this host.")
+engine = st.radio("Query engine", engines, horizontal=True)
+
+def get_analytics_conn():
+    if "analytics_conn" not in st.session_state:
+        st.session_state["analytics_conn"] = connect_analytics(get_db_path(conn))
+    return st.session_state["analytics_conn"]
+
+def run_query(query_type, params=()):
+    if engine == "DuckDB":
+        return get_query_results_duckdb(get_analytics_conn(), query_type, params)
+    return get_query_results(conn, query_type, params)
+
 # Execute on click
 if st.button("Run Query"):
     with st.spinner("Running the selected query..."):
         try:
-            results = get_query_results(conn, query_type)
+            results = run_query(query_type, params)
 
             st.subheader(f"Results for: {query_label}")
 
@@ -55,3 +87,25 @@ if st.button("Run Query"):
 
         except Exception as e:
             st.error(f"An error occurred while executing the query: {e}")
+
+# Engine parity check
+if engine == "DuckDB":
+    with st.expander("Check SQLite / DuckDB parity"):
+        if st.button("Run parity check"):
+            with st.spinner("Running all queries on both engines..."):
+                mismatches = check_backend_parity(conn, get_analytics_conn())
+            if mismatches:
+                st.error("Engines disagree on some queries.")
+                st.json(mismatches)
+            else:
+                st.success("Both engines return identical results for all queries.")
+
+# Slow-query log
+slow_queries = get_slow_queries(conn)
+if slow_queries:
+    with st.expander(f"Slow queries (over {SLOW_QUERY_THRESHOLD_MS:.0f} ms): {len(slow_queries)}"):
+        for entry in slow_queries:
+            label = "FULL SCAN " if entry["full_scans"] else ""
+            st.markdown(f"**{label}{entry['elapsed_ms']} ms**, {entry['rows']} rows")
+            st.code(entry["query"], language="sql")
+            st.text("\n".join(entry["plan"]))
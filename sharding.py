@@ -0,0 +1,190 @@
+import argparse
+import logging
+import os
+import sqlite3 as sql
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from database import connect_to_db, create_tables, store_channel_data
+
+# Tables the federated connection exposes across all shards
+SHARDED_TABLES = ("Channel", "Playlist", "Video", "Comment", "StatsSnapshot", "Tag", "VideoTag")
+# Tables whose rows repeat across shards (tag ids are the same everywhere)
+DEDUPLICATED_TABLES = {"Tag"}
+# SQLite's default limit on attached databases; the federated view needs every shard attached
+MAX_SHARDS = 10
+
+
+def shard_path(channel_id, shard_dir="shards", buckets=None):
+    """
+    Returns the shard file for a channel: one file per channel by default, or
+    one of `buckets` files chosen by a stable hash of the channel id.
+    """
+    if buckets:
+        name = f"bucket_{zlib.crc32(channel_id.encode('utf-8')) % buckets:03d}.db"
+    else:
+        safe_id = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in channel_id)
+        name = f"channel_{safe_id}.db"
+    return os.path.join(shard_dir, name)
+
+
+def check_shard_capacity(paths, shard_dir="shards"):
+    """Raises ValueError if creating these shard files would exceed MAX_SHARDS."""
+    shards = set(list_shards(shard_dir)) | set(paths)
+    if len(shards) > MAX_SHARDS:
+        raise ValueError(
+            f"Sharded storage is limited to {MAX_SHARDS} shard files, which is SQLite's attach limit. "
+            f"This would need {len(shards)}. Use hash buckets (at most {MAX_SHARDS}) "
+            f"instead of one file per channel."
+        )
+
+
+def connect_to_shard(channel_id, shard_dir="shards", buckets=None):
+    if buckets and buckets > MAX_SHARDS:
+        raise ValueError(f"At most {MAX_SHARDS} hash buckets are supported.")
+    path = shard_path(channel_id, shard_dir, buckets)
+    check_shard_capacity([path], shard_dir)
+    os.makedirs(shard_dir, exist_ok=True)
+    conn = connect_to_db(path)
+    create_tables(conn)
+    return conn
+
+
+def list_shards(shard_dir="shards"):
+    if not os.path.isdir(shard_dir):
+        return []
+    return sorted(
+        os.path.join(shard_dir, name) for name in os.listdir(shard_dir) if name.endswith(".db")
+    )
+
+
+def connect_federated(shard_dir="shards"):
+    """
+    Opens a read connection that presents every shard as one database, so
+    execute_query/get_query_results work unchanged. The base tables are created
+    empty in memory and shadowed by TEMP views over the attached shards.
+    """
+    conn = connect_to_db(":memory:")
+    create_tables(conn)
+    refresh_federated(conn, shard_dir)
+    return conn
+
+
+def refresh_federated(conn, shard_dir="shards"):
+    """Re-attaches the shards, picking up any created since the last refresh."""
+    for table in SHARDED_TABLES:
+        conn.execute(f"DROP VIEW IF EXISTS temp.{table}")
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1].startswith("shard_"):
+            conn.execute(f"DETACH DATABASE {row[1]}")
+
+    shards = list_shards(shard_dir)
+    if not shards:
+        return
+
+    # Explicit column lists, since migrated shards may order columns differently
+    columns = {
+        table: ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})").fetchall())
+        for table in SHARDED_TABLES
+    }
+
+    limit = min(MAX_SHARDS, conn.getlimit(sql.SQLITE_LIMIT_ATTACHED))
+    if len(shards) > limit:
+        raise ValueError(
+            f"{shard_dir} holds {len(shards)} shard files, but only {limit} can be attached. "
+            f"Re-ingest into at most {limit} hash buckets."
+        )
+
+    aliases = []
+    for i, path in enumerate(shards):
+        alias = f"shard_{i}"
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+        aliases.append(alias)
+    for table in SHARDED_TABLES:
+        separator = " UNION " if table in DEDUPLICATED_TABLES else " UNION ALL "
+        union = separator.join(f"SELECT {columns[table]} FROM {alias}.{table}" for alias in aliases)
+        conn.execute(f"CREATE TEMP VIEW {table} AS {union}")
+    logging.info(f"Federated connection attached {len(shards)} shards.")
+    conn.commit()
+
+
+def _ingest_shard(api_key, channel_ids, db_path):
+    """Worker process: fetches channels and writes them to a single shard file."""
+    from fetch import initialize_youtube_api, fetch_channel_data
+    from data_processing import transform_channel_data
+    from stats_history import record_snapshots
+
+    youtube = initialize_youtube_api(api_key)
+    conn = connect_to_db(db_path)
+    create_tables(conn)
+    results = {}
+    try:
+        for channel_id in channel_ids:
+            cleaned_data = transform_channel_data(fetch_channel_data(youtube, channel_id))
+            if not cleaned_data["videos"]:
+                logging.warning(f"No videos extracted for channel {channel_id}; nothing stored.")
+                results[channel_id] = 0
+                continue
+            store_channel_data(conn, cleaned_data)
+            record_snapshots(conn, cleaned_data["channel"], cleaned_data["videos"])
+            results[channel_id] = len(cleaned_data["videos"])
+    finally:
+        conn.close()
+    return results
+
+
+def ingest_channels_sharded(api_key, channel_ids, shard_dir="shards", buckets=None, max_workers=None):
+    """
+    Ingests channels in parallel processes, each owning its shard files, so
+    writers never contend for the same SQLite lock. Channels sharing a hash
+    bucket are handled sequentially by one worker. Returns {channel_id: videos
+    stored}, with None for channels whose worker failed.
+    """
+    if buckets and buckets > MAX_SHARDS:
+        raise ValueError(f"At most {MAX_SHARDS} hash buckets are supported.")
+    groups = {}
+    for channel_id in channel_ids:
+        groups.setdefault(shard_path(channel_id, shard_dir, buckets), []).append(channel_id)
+    check_shard_capacity(groups, shard_dir)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_ingest_shard, api_key, ids, path): ids for path, ids in groups.items()
+        }
+        for future in as_completed(futures):
+            try:
+                results.update(future.result())
+            except Exception as e:
+                logging.error(f"Sharded ingestion failed for {futures[future]}: {e}")
+                results.update({channel_id: None for channel_id in futures[future]})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ingest YouTube channels into sharded SQLite files using parallel processes."
+    )
+    parser.add_argument("channel_ids", nargs="+", help="YouTube channel IDs to ingest")
+    parser.add_argument("--api-key", default=os.environ.get("YOUTUBE_API_KEY"),
+                        help="YouTube Data API key (defaults to $YOUTUBE_API_KEY)")
+    parser.add_argument("--shard-dir", default="shards", help="Directory holding the shard files")
+    parser.add_argument("--buckets", type=int, default=8,
+                        help=f"Hash buckets, at most {MAX_SHARDS} (0 = one file per channel)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or $YOUTUBE_API_KEY)")
+
+    results = ingest_channels_sharded(
+        args.api_key, args.channel_ids, args.shard_dir, args.buckets or None, args.workers
+    )
+    for channel_id in args.channel_ids:
+        stored = results.get(channel_id)
+        status = "FAILED" if stored is None else f"{stored} videos"
+        print(f"{channel_id}: {status} -> {shard_path(channel_id, args.shard_dir, args.buckets or None)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import logging
+import time
+from database import to_epoch
+
+# Bucket widths in seconds, also used as the StatsSnapshot.resolution value
+RAW = 0
+HOURLY = 3600
+DAILY = 86400
+
+METRIC_COLUMNS = {
+    "views": "view_delta",
+    "likes": "like_delta",
+    "comments": "comment_delta"
+}
+
+
+def _upsert_deltas(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO StatsSnapshot (
+            entity_type, entity_id, ts, resolution, view_delta, like_delta, comment_delta
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (entity_type, entity_id, ts, resolution) DO UPDATE SET
+            view_delta = view_delta + excluded.view_delta,
+            like_delta = like_delta + excluded.like_delta,
+            comment_delta = comment_delta + excluded.comment_delta
+    """, rows)
+
+
+def record_snapshots(conn, channel=None, videos=(), ts=None):
+    """
+    Appends a statistics snapshot for a channel and its videos.
+
+    Only the change since the previous snapshot is stored, and entities whose
+    counters did not move are skipped entirely, so repeated refreshes of a
+    mostly static channel cost almost nothing. Returns the number of rows written.
+    """
+    ts = to_epoch(ts) if ts is not None else int(time.time())
+
+    current = {}
+    if channel:
+        current[("channel", channel["channel_id"])] = (channel.get("channel_views", 0), 0, 0)
+    for video in videos:
+        current[("video", video["video_id"])] = (
+            video.get("view_count", 0), video.get("like_count", 0), video.get("comment_count", 0)
+        )
+    if not current:
+        return 0
+
+    cursor = conn.cursor()
+    try:
+        previous = {}
+        keys = list(current)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ", ".join("(?, ?)" for _ in chunk)
+            cursor.execute(f"""
+                SELECT entity_type, entity_id, view_count, like_count, comment_count
+                FROM StatsLatest
+                WHERE (entity_type, entity_id) IN (VALUES {placeholders})
+            """, [part for key in chunk for part in key])
+            for row in cursor.fetchall():
+                previous[(row[0], row[1])] = (row[2], row[3], row[4])
+
+        deltas = []
+        latest = []
+        for key, counts in current.items():
+            prev = previous.get(key, (0, 0, 0))
+            delta = tuple((c or 0) - (p or 0) for c, p in zip(counts, prev))
+            if key in previous and not any(delta):
+                continue
+            deltas.append((key[0], key[1], ts, RAW) + delta)
+            latest.append((key[0], key[1], ts) + counts)
+
+        _upsert_deltas(cursor, deltas)
+        cursor.executemany("""
+            INSERT OR REPLACE INTO StatsLatest (
+                entity_type, entity_id, ts, view_count, like_count, comment_count
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, latest)
+        conn.commit()
+        logging.info(f"Recorded {len(deltas)} stats snapshots ({len(current) - len(deltas)} unchanged).")
+        return len(deltas)
+    finally:
+        cursor.close()
+
+
+def rollup_snapshots(conn, now=None, raw_retention=2 * DAILY, hourly_retention=90 * DAILY,
+                     daily_retention=None):
+    """
+    Downsamples old snapshots: raw rows older than `raw_retention` seconds are
+    summed into hourly buckets, hourly rows older than `hourly_retention` into
+    daily buckets. With `daily_retention` set, daily rows older than that are
+    folded into a single baseline row so cumulative totals stay correct.
+    """
+    now = to_epoch(now) if now is not None else int(time.time())
+    tiers = [(RAW, HOURLY, raw_retention), (HOURLY, DAILY, hourly_retention)]
+
+    cursor = conn.cursor()
+    try:
+        for source, target, retention in tiers:
+            if retention is None:
+                continue
+            # Align to the target bucket so a bucket is never split across tiers
+            cutoff = (now - retention) // target * target
+            cursor.execute(f"""
+                INSERT INTO StatsSnapshot (
+                    entity_type, entity_id, ts, resolution, view_delta, like_delta, comment_delta
+                )
+                SELECT entity_type, entity_id, ts - ts % {target}, {target},
+                       SUM(view_delta), SUM(like_delta), SUM(comment_delta)
+                FROM StatsSnapshot
+                WHERE resolution = ? AND ts < ?
+                GROUP BY entity_type, entity_id, ts - ts % {target}
+                ON CONFLICT (entity_type, entity_id, ts, resolution) DO UPDATE SET
+                    view_delta = view_delta + excluded.view_delta,
+                    like_delta = like_delta + excluded.like_delta,
+                    comment_delta = comment_delta + excluded.comment_delta
+            """, (source, cutoff))
+            cursor.execute(
+                "DELETE FROM StatsSnapshot WHERE resolution = ? AND ts < ?", (source, cutoff)
+            )
+            logging.info(f"Rolled up {cursor.rowcount} snapshots from resolution {source} to {target}.")
+
+        if daily_retention is not None:
+            cutoff = (now - daily_retention) // DAILY * DAILY
+            cursor.execute("""
+                SELECT entity_type, entity_id, SUM(view_delta), SUM(like_delta), SUM(comment_delta)
+                FROM StatsSnapshot
+                WHERE resolution = ? AND ts < ?
+                GROUP BY entity_type, entity_id
+            """, (DAILY, cutoff))
+            baselines = [(row[0], row[1], cutoff, DAILY, row[2], row[3], row[4]) for row in cursor.fetchall()]
+            cursor.execute(
+                "DELETE FROM StatsSnapshot WHERE resolution = ? AND ts < ?", (DAILY, cutoff)
+            )
+            _upsert_deltas(cursor, baselines)
+            logging.info(f"Folded expired daily snapshots into {len(baselines)} baselines.")
+
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def get_stats_series(conn, entity_type, entity_id, metric="views", start=None, end=None):
+    """
+    Returns [{"ts": epoch, "value": cumulative_count}] for one entity between
+    `start` and `end` (inclusive, epoch seconds or datetimes). Raw, hourly and
+    daily rows are merged, so older history comes back at coarser resolution.
+    """
+    column = METRIC_COLUMNS.get(metric)
+    if not column:
+        raise ValueError(f"Invalid metric: {metric}")
+
+    start = to_epoch(start)
+    end = to_epoch(end)
+    cursor = conn.cursor()
+    try:
+        # Every delta up to `start` contributes to the baseline, so only `end` bounds the scan
+        cursor.execute(f"""
+            SELECT ts, value FROM (
+                SELECT ts, SUM(delta) OVER (ORDER BY ts ROWS UNBOUNDED PRECEDING) AS value
+                FROM (
+                    SELECT ts, SUM({column}) AS delta
+                    FROM StatsSnapshot
+                    WHERE entity_type = ? AND entity_id = ? AND (? IS NULL OR ts <= ?)
+                    GROUP BY ts
+                )
+            )
+            WHERE ? IS NULL OR ts >= ?
+            ORDER BY ts
+        """, (entity_type, entity_id, end, end, start, start))
+        return [{"ts": row[0], "value": row[1]} for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def get_channel_views_series(conn, channel_id, start=None, end=None):
+    """Views over time for a channel."""
+    return get_stats_series(conn, "channel", channel_id, "views", start, end)
@@ -0,0 +1,90 @@
+import sqlite3 as sql
+
+import pandas as pd
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+
+import analytics
+from analytics import (
+    SNAPSHOT_TABLES, check_backend_parity, connect_analytics, export_parquet_snapshot, sqlite_extension_available
+)
+from database import connect_to_db, get_query_results, tag_query_params
+from load_test import generate_database
+
+# The sqlite extension is downloaded on first use, so offline hosts cannot attach
+requires_sqlite_extension = pytest.mark.skipif(
+    not sqlite_extension_available(), reason="DuckDB sqlite extension cannot be installed"
+)
+
+
+@pytest.fixture(scope="module")
+def db_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("parity") / "parity.db")
+    generate_database(path, channels=3, videos_per_channel=40, comments_per_video=3, seed=7)
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect_to_db(db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def copied_con(db_path):
+    """DuckDB with the small test tables copied in, to check query dialects without the extension."""
+    con = duckdb.connect()
+    source = sql.connect(db_path)
+    try:
+        for table in SNAPSHOT_TABLES:
+            con.register("source_df", pd.read_sql(f"SELECT * FROM {table}", source))
+            con.execute(f"CREATE TABLE {table} AS SELECT * FROM source_df")
+            con.unregister("source_df")
+    finally:
+        source.close()
+    yield con
+    con.close()
+
+
+def cooccurring_tag_params(conn):
+    # Use a tag pair that really co-occurs so the DuckDB rewrite is exercised on rows
+    pair = get_query_results(conn, "tag_cooccurrence")[0]
+    params = tag_query_params([pair["tag"], pair["co_tag"]])
+    assert get_query_results(conn, "videos_for_tags", params)
+    return {"videos_for_tags": params}
+
+
+def test_duckdb_queries_match_sqlite_on_copied_tables(conn, copied_con):
+    assert check_backend_parity(conn, copied_con) == {}
+
+
+def test_videos_for_tags_rewrite_matches_sqlite_on_copied_tables(conn, copied_con):
+    assert check_backend_parity(conn, copied_con, sample_params=cooccurring_tag_params(conn)) == {}
+
+
+def test_connect_analytics_fails_without_sqlite_extension(db_path, monkeypatch):
+    monkeypatch.setattr(analytics, "sqlite_extension_available", lambda: False)
+    with pytest.raises(ImportError, match="sqlite"):
+        connect_analytics(db_path)
+
+
+@requires_sqlite_extension
+def test_attached_sqlite_matches_sqlite(conn, db_path):
+    con = connect_analytics(db_path)
+    try:
+        assert check_backend_parity(conn, con) == {}
+        assert check_backend_parity(conn, con, sample_params=cooccurring_tag_params(conn)) == {}
+    finally:
+        con.close()
+
+
+@requires_sqlite_extension
+def test_parquet_snapshot_matches_sqlite(conn, db_path, tmp_path):
+    export_parquet_snapshot(db_path, str(tmp_path))
+    con = connect_analytics(parquet_dir=str(tmp_path))
+    try:
+        assert check_backend_parity(conn, con) == {}
+    finally:
+        con.close()
@@ -0,0 +1,17 @@
+import database
+from database import connect_to_db, create_tables, execute_query, get_slow_queries
+
+
+def test_slow_query_log_is_kept_per_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "SLOW_QUERY_THRESHOLD_MS", 0)
+    path = str(tmp_path / "slow.db")
+    first, second = connect_to_db(path), connect_to_db(path)
+    try:
+        create_tables(first)
+        execute_query(first, "SELECT * FROM Video")
+        assert [entry["query"] for entry in get_slow_queries(first)] == ["SELECT * FROM Video"]
+        assert get_slow_queries(first)[0]["full_scans"]
+        assert get_slow_queries(second) == []
+    finally:
+        first.close()
+        second.close()
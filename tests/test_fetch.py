@@ -0,0 +1,163 @@
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from database import connect_to_db, create_tables, get_comment_harvest_state
+from fetch import harvest_video_comments
+
+VIDEO_ID = "vid"
+PAGE_TOKENS = [None, "p2", "p3"]
+REPLY_PAGE_SIZE = 3
+
+
+def snippet(text):
+    return {"textDisplay": text, "authorDisplayName": "author", "publishedAt": "2024-01-01T00:00:00Z"}
+
+
+def thread_page(page):
+    """Three threads: two inline replies, five replies of which only one is inline, and none."""
+    return [
+        {
+            "id": f"t{page}0",
+            "snippet": {"totalReplyCount": 2, "topLevelComment": {"snippet": snippet("top")}},
+            "replies": {"comments": [{"id": f"r{page}0{i}", "snippet": snippet("reply")} for i in range(2)]}
+        },
+        {
+            "id": f"t{page}1",
+            "snippet": {"totalReplyCount": 5, "topLevelComment": {"snippet": snippet("top")}},
+            "replies": {"comments": [{"id": f"r{page}10", "snippet": snippet("reply")}]}
+        },
+        {"id": f"t{page}2", "snippet": {"totalReplyCount": 0, "topLevelComment": {"snippet": snippet("top")}}}
+    ]
+
+
+def expected_ids():
+    """Comment ids in the order the harvester buffers them."""
+    ids = []
+    for page in range(len(PAGE_TOKENS)):
+        ids += [f"t{page}0", f"r{page}00", f"r{page}01", f"t{page}1"]
+        ids += [f"r{page}1{i}" for i in range(5)]
+        ids += [f"t{page}2"]
+    return ids
+
+
+def http_error(status=500):
+    return HttpError(httplib2.Response({"status": status}), b"backend error")
+
+
+class FakeRequest:
+    def __init__(self, execute, **kwargs):
+        self.execute = execute
+        self.kwargs = kwargs
+
+
+class FakeYouTube:
+    """
+    Serves the thread pages above. `fail_on` is a (parent_id, reply_page)
+    pair whose comments().list page raises an HttpError.
+    """
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.thread_tokens = []
+        self.reply_parents = []
+
+    def commentThreads(self):
+        return self
+
+    def comments(self):
+        return FakeComments(self)
+
+    def list(self, videoId, pageToken=None, **kwargs):
+        self.thread_tokens.append(pageToken)
+        page = PAGE_TOKENS.index(pageToken)
+        response = {"items": thread_page(page)}
+        if page + 1 < len(PAGE_TOKENS):
+            response["nextPageToken"] = PAGE_TOKENS[page + 1]
+        return FakeRequest(lambda: response)
+
+
+class FakeComments:
+    def __init__(self, youtube):
+        self.youtube = youtube
+
+    def _page(self, parent_id, page):
+        def execute():
+            if self.youtube.fail_on == (parent_id, page):
+                raise http_error()
+            page_number = parent_id[1]
+            replies = [f"r{page_number}1{i}" for i in range(5)]
+            items = replies[page * REPLY_PAGE_SIZE:(page + 1) * REPLY_PAGE_SIZE]
+            response = {"items": [{"id": reply_id, "snippet": snippet("reply")} for reply_id in items]}
+            if (page + 1) * REPLY_PAGE_SIZE < len(replies):
+                response["nextPageToken"] = str(page + 1)
+            return response
+        return FakeRequest(execute, parent_id=parent_id, page=page)
+
+    def list(self, parentId, **kwargs):
+        self.youtube.reply_parents.append(parentId)
+        return self._page(parentId, 0)
+
+    def list_next(self, request, response):
+        if "nextPageToken" not in response:
+            return None
+        return self._page(request.kwargs["parent_id"], request.kwargs["page"] + 1)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect_to_db(str(tmp_path / "harvest.db"))
+    create_tables(conn)
+    yield conn
+    conn.close()
+
+
+def stored_ids(conn):
+    return [row["comment_id"] for row in conn.execute("SELECT comment_id FROM Comment ORDER BY rowid")]
+
+
+def test_harvest_stores_every_thread_and_reply(conn):
+    youtube = FakeYouTube()
+    assert harvest_video_comments(youtube, conn, VIDEO_ID, batch_size=4) == len(expected_ids())
+
+    assert sorted(stored_ids(conn)) == sorted(expected_ids())
+    assert get_comment_harvest_state(conn, VIDEO_ID) == (None, True)
+    # Only the thread with more replies than were inlined is paged through comments.list
+    assert youtube.reply_parents == ["t01", "t11", "t21"]
+    replies = conn.execute("SELECT COUNT(*) FROM Comment WHERE parent_id = 't11'").fetchone()[0]
+    assert replies == 5
+
+    # A completed video is not fetched again
+    assert harvest_video_comments(FakeYouTube(), conn, VIDEO_ID) == 0
+
+
+def test_harvest_resumes_after_error_without_gaps_or_duplicates(conn):
+    # Fail on the second reply page of the second thread page, mid-way through that page
+    written = harvest_video_comments(FakeYouTube(fail_on=("t11", 1)), conn, VIDEO_ID, batch_size=5)
+
+    # Only flushed batches survive; the rows buffered since the last flush are rolled back
+    buffered_before_error = expected_ids().index("r112") + 1
+    assert 10 < written < buffered_before_error
+    assert stored_ids(conn) == expected_ids()[:written]
+    # Mid-page flushes keep the token of the page being read, so a resume redoes that page
+    assert get_comment_harvest_state(conn, VIDEO_ID) == ("p2", False)
+
+    youtube = FakeYouTube()
+    harvest_video_comments(youtube, conn, VIDEO_ID, batch_size=4)
+    assert youtube.thread_tokens == ["p2", "p3"]
+    ids = stored_ids(conn)
+    assert len(ids) == len(set(ids))
+    assert sorted(ids) == sorted(expected_ids())
+    assert get_comment_harvest_state(conn, VIDEO_ID) == (None, True)
+
+
+def test_harvest_checkpoints_at_page_budget(conn):
+    harvest_video_comments(FakeYouTube(), conn, VIDEO_ID, batch_size=100, max_pages=1)
+    assert stored_ids(conn) == expected_ids()[:10]
+    assert get_comment_harvest_state(conn, VIDEO_ID) == ("p2", False)
+
+    youtube = FakeYouTube()
+    harvest_video_comments(youtube, conn, VIDEO_ID, batch_size=100)
+    assert youtube.thread_tokens == ["p2", "p3"]
+    assert sorted(stored_ids(conn)) == sorted(expected_ids())
+    assert get_comment_harvest_state(conn, VIDEO_ID) == (None, True)
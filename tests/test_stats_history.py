@@ -0,0 +1,110 @@
+import bisect
+import random
+
+import pytest
+
+from database import connect_to_db, create_tables
+from stats_history import (
+    DAILY, HOURLY, get_channel_views_series, get_stats_series, record_snapshots, rollup_snapshots
+)
+
+START = 1_700_000_000 // DAILY * DAILY
+# Deliberately not on a bucket boundary
+NOW = START + 120 * DAILY + 13 * HOURLY + 1234
+RAW_RETENTION = 2 * DAILY
+HOURLY_RETENTION = 30 * DAILY
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """A channel and video refreshed every 5 hours for 120 days; returns (conn, {ts: counts})."""
+    conn = connect_to_db(str(tmp_path / "stats.db"))
+    create_tables(conn)
+    rng = random.Random(3)
+    views, likes = 0, 0
+    history = {}
+    for ts in range(START, NOW, 5 * HOURLY):
+        # Some refreshes see no change, which records nothing
+        if rng.random() < 0.8:
+            views += rng.randint(0, 500)
+            likes += rng.randint(0, 20)
+        record_snapshots(
+            conn,
+            {"channel_id": "chan", "channel_views": views * 3},
+            [{"video_id": "vid", "view_count": views, "like_count": likes, "comment_count": 0}],
+            ts=ts
+        )
+        history[ts] = (views, likes)
+    yield conn, history
+    conn.close()
+
+
+def count_at(history, ts, index=0):
+    """The counter as of the last refresh at or before `ts`."""
+    times = sorted(history)
+    position = bisect.bisect_right(times, ts)
+    return history[times[position - 1]][index] if position else 0
+
+
+def bucket_width(ts, hourly_cutoff, raw_cutoff):
+    if ts < hourly_cutoff:
+        return DAILY
+    return HOURLY if ts < raw_cutoff else 1
+
+
+def snapshot_rows(conn):
+    return conn.execute("SELECT COUNT(*) FROM StatsSnapshot").fetchone()[0]
+
+
+def test_raw_series_is_cumulative(recorded):
+    conn, history = recorded
+    series = get_stats_series(conn, "video", "vid", "likes")
+    assert series
+    for point in series:
+        assert point["value"] == count_at(history, point["ts"], index=1)
+
+
+def test_rollup_keeps_cumulative_series(recorded):
+    conn, history = recorded
+    before = get_stats_series(conn, "video", "vid")
+    rows_before = snapshot_rows(conn)
+
+    rollup_snapshots(conn, now=NOW, raw_retention=RAW_RETENTION, hourly_retention=HOURLY_RETENTION)
+    after = get_stats_series(conn, "video", "vid")
+
+    assert snapshot_rows(conn) < rows_before
+    assert after[-1] == before[-1]
+    raw_cutoff = (NOW - RAW_RETENTION) // HOURLY * HOURLY
+    hourly_cutoff = (NOW - HOURLY_RETENTION) // DAILY * DAILY
+    # Recent raw snapshots are untouched
+    assert [p for p in after if p["ts"] >= raw_cutoff] == [p for p in before if p["ts"] >= raw_cutoff]
+    # A bucket's cumulative value is the count at the end of that bucket
+    for point in after:
+        width = bucket_width(point["ts"], hourly_cutoff, raw_cutoff)
+        assert point["value"] == count_at(history, point["ts"] + width - 1)
+    assert any(p["ts"] % DAILY == 0 and p["ts"] < hourly_cutoff for p in after)
+
+    # Rolling up again at the same time changes nothing
+    rollup_snapshots(conn, now=NOW, raw_retention=RAW_RETENTION, hourly_retention=HOURLY_RETENTION)
+    assert get_stats_series(conn, "video", "vid") == after
+
+
+def test_daily_retention_folds_history_into_baseline(recorded):
+    conn, history = recorded
+    rollup_snapshots(conn, now=NOW, raw_retention=RAW_RETENTION, hourly_retention=HOURLY_RETENTION,
+                     daily_retention=60 * DAILY)
+    baseline_ts = (NOW - 60 * DAILY) // DAILY * DAILY
+
+    series = get_channel_views_series(conn, "chan")
+    assert series[0]["ts"] == baseline_ts
+    assert series[0]["value"] == count_at(history, baseline_ts + DAILY - 1) * 3
+    assert series[-1]["value"] == count_at(history, NOW) * 3
+
+    # A start before the baseline returns the same series
+    assert get_channel_views_series(conn, "chan", start=START - DAILY) == series
+    assert get_channel_views_series(conn, "chan", start=baseline_ts) == series
+
+    # A later start still counts every delta before it, baseline included
+    start = baseline_ts + 10 * DAILY
+    windowed = get_channel_views_series(conn, "chan", start=start, end=start + 5 * DAILY)
+    assert windowed == [p for p in series if start <= p["ts"] <= start + 5 * DAILY]